@@ -0,0 +1,167 @@
+"""Offline asset pipeline: bakes every sprite into assets.bundle so the game skips image decoding at startup.
+
+usage: python asset_pipeline.py [--screen WIDTHxHEIGHT] [--force]
+
+Only sources whose contents (or target size) changed since the last build get decoded again,
+everything else is copied straight out of the previous bundle.
+"""
+import argparse
+import hashlib
+import json
+import os
+import struct
+import numpy as np
+import pygame
+from assets import (SPRITE_MANIFEST, GIF_MANIFEST, FOOD_SIZES, BUNDLE_PATH, BUNDLE_MAGIC, BUNDLE_VERSION,
+                    BUNDLE_HEADER, AssetBundle, align_up, bundle_data_start, decode_sprite, decode_gif,
+                    food_entry_name)
+from classes import IMAGE_PATHS
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(65536), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# every (name, source, target size, mode) the bundle should contain
+def collect_jobs(screen_size):
+    jobs = []
+    covered = set()
+    for name, (path, size, mode) in SPRITE_MANIFEST.items():
+        jobs.append((name, path, screen_size if mode == "screen" else size, mode))
+        covered.add(os.path.normpath(path))
+    for name, (path, size) in GIF_MANIFEST.items():
+        jobs.append((name, path, size, "gif"))
+        covered.add(os.path.normpath(path))
+    for path in IMAGE_PATHS:
+        for size in FOOD_SIZES:
+            jobs.append((food_entry_name(path, size), path, size, "stretch"))
+
+    # anything else under new_sprites/ goes in at its original size so the bundle has the whole set
+    for folder, _, files in os.walk("new_sprites"):
+        for file_name in sorted(files):
+            path = os.path.normpath(os.path.join(folder, file_name))
+            if path in covered or not file_name.lower().endswith(".png"):
+                continue
+            name = "extra:" + path.replace(os.sep, "/")
+            jobs.append((name, path, None, "native"))
+    return jobs
+
+
+# returns a list of (surface, duration in ms)
+def render_job(path, size, mode):
+    if mode == "gif":
+        frames, durations = decode_gif(path, size)
+        return list(zip(frames, durations))
+    if mode == "native":
+        return [(pygame.image.load(path), 0)]
+    return [(decode_sprite(path, size, mode, size), 0)]
+
+
+# picks how the game should blit the entry and returns (hint, colorkey, pixel bytes per frame)
+#   opaque   - no transparency at all, plain convert()
+#   colorkey - pixels are either fully clear or fully solid, so colorkey + RLEACCEL works
+#   alpha    - real partial transparency, convert_alpha()
+def pack_frames(surfaces):
+    arrays = []
+    for surface in surfaces:
+        raw = pygame.image.tobytes(surface, "BGRA")
+        arrays.append(np.frombuffer(raw, dtype=np.uint8).reshape(-1, 4).copy())
+    alpha = np.concatenate([a[:, 3] for a in arrays])
+
+    if np.all(alpha == 255):
+        return "opaque", None, [a.tobytes() for a in arrays]
+    if not np.all((alpha == 0) | (alpha == 255)):
+        return "alpha", None, [a.tobytes() for a in arrays]
+
+    # find a colour none of the solid pixels use, magenta first since it almost never shows up in sprites
+    solid = np.concatenate([a[a[:, 3] == 255, :3] for a in arrays])
+    used = set(map(tuple, np.unique(solid, axis=0).tolist())) if len(solid) else set()
+    key_bgr = next((c for c in [(255, 0, 255), (0, 255, 0), (255, 255, 0), (1, 2, 3)] if c not in used), None)
+    if key_bgr is None:  # every candidate shows up in the sprite, plain alpha still works
+        return "alpha", None, [a.tobytes() for a in arrays]
+    for a in arrays:
+        clear = a[:, 3] == 0
+        a[clear, :3] = key_bgr
+        a[:, 3] = 255
+    colorkey = [key_bgr[2], key_bgr[1], key_bgr[0]]  # stored as BGR, pygame wants RGB
+    return "colorkey", colorkey, [a.tobytes() for a in arrays]
+
+
+def build_bundle(screen_size, path=BUNDLE_PATH, force=False):
+    previous = None if force else AssetBundle.open_if_present(path)
+    entries = {}
+    blocks = []
+    data_length = 0
+    rebuilt = 0
+    reused = 0
+
+    for name, source, size, mode in collect_jobs(screen_size):
+        source_hash = file_hash(source)
+        target = list(size) if size else None
+        old = previous.entries.get(name) if previous is not None else None
+
+        if old is not None and old["hash"] == source_hash and old["target"] == target and old["mode"] == mode:
+            # unchanged source, copy the already baked pixels over
+            hint, colorkey = old["blit"], old["colorkey"]
+            pixel_blocks = []
+            for frame in old["frames"]:
+                start = previous.data_start + frame["offset"]
+                pixel_blocks.append((bytes(previous.data[start:start + frame["length"]]), frame["size"], frame["duration"]))
+            reused += 1
+        else:
+            rendered = render_job(source, size, mode)
+            hint, colorkey, raw_frames = pack_frames([surface for surface, _ in rendered])
+            pixel_blocks = [(raw, list(surface.get_size()), duration)
+                            for raw, (surface, duration) in zip(raw_frames, rendered)]
+            rebuilt += 1
+
+        frames = []
+        for raw, frame_size, duration in pixel_blocks:
+            data_length = align_up(data_length)
+            frames.append({"offset": data_length, "length": len(raw), "size": frame_size, "duration": duration})
+            blocks.append((data_length, raw))
+            data_length += len(raw)
+        entries[name] = {"source": source.replace(os.sep, "/"), "hash": source_hash, "target": target,
+                         "mode": mode, "blit": hint, "colorkey": colorkey, "frames": frames}
+
+    if previous is not None:
+        previous.close()
+
+    index = json.dumps(entries, separators=(",", ":")).encode("utf-8")
+    data_start = bundle_data_start(len(index))
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(struct.pack(BUNDLE_HEADER, BUNDLE_MAGIC, BUNDLE_VERSION, len(index)))
+        file.write(index)
+        for offset, raw in blocks:
+            file.seek(data_start + offset)
+            file.write(raw)
+    os.replace(tmp_path, path)  # readers never see a half written bundle
+
+    print(f"Wrote {path}: {len(entries)} entries, {rebuilt} rebuilt, {reused} reused, "
+          f"{(data_start + data_length) / 1024 / 1024:.1f} MB")
+
+
+def parse_size(text):
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pack the game's sprites into a memory-mappable bundle")
+    parser.add_argument("--screen", type=parse_size, default=None,
+                        help="screen size to bake the background at, e.g. 1920x1080 (default: this display)")
+    parser.add_argument("--force", action="store_true", help="ignore the previous bundle and rebuild everything")
+    parser.add_argument("--output", default=BUNDLE_PATH)
+    args = parser.parse_args()
+
+    pygame.display.init()
+    screen_size = args.screen
+    if screen_size is None:
+        info = pygame.display.Info()
+        screen_size = (info.current_w, info.current_h)
+    build_bundle(screen_size, args.output, args.force)
@@ -0,0 +1,439 @@
+import bisect
+import itertools
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import pygame
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from classes import IMAGE_PATHS
+
+# Asset list -----------------------------------------------------------
+
+def sprite_path(*parts):
+    return os.path.join("new_sprites", *parts)
+
+# name -> (source file, target size, how to fit it)
+# "fit" keeps the aspect ratio and centers it (load_and_scale_sprite), "stretch" is a plain scale,
+# "screen" is stretched to whatever the display size is
+SPRITE_MANIFEST = {
+    "background": (sprite_path("spr_chefs_BG", "spr_chefs_BG_0.png"), None, "screen"),
+    "player_idle": (sprite_path("spr_kris_chef_default.png"), (70, 120), "fit"),
+    "player_walk_left": (sprite_path("spr_kris_chef_walk", "spr_kris_chef_walk_0.png"), (70, 120), "fit"),
+    "player_walk_right": (sprite_path("spr_kris_chef_walk", "spr_kris_chef_walk_1.png"), (70, 120), "fit"),
+    "player_jump": (sprite_path("spr_kris_chef_jump.png"), (70, 120), "fit"),
+    "player_hit": (sprite_path("spr_chefs_kris_stun", "spr_chefs_kris_stun_0.png"), (70, 120), "fit"),
+    "player_stunned": (sprite_path("spr_chefs_kris_stun", "spr_chefs_kris_stun_1.png"), (70, 120), "fit"),
+    "player_throw_start": (sprite_path("spr_chefs_kris_throw", "spr_chefs_kris_throw_0.png"), (70, 120), "fit"),
+    "player_throw": (sprite_path("spr_chefs_kris_throw", "spr_chefs_kris_throw_1.png"), (70, 120), "fit"),
+    "customer_0": (sprite_path("spr_shadowman_run3", "spr_shadowman_run3_1.png"), (100, 120), "fit"),
+    "customer_1": (sprite_path("spr_shadowman_run3", "spr_shadowman_run3_0.png"), (100, 120), "fit"),
+    "fireball": (sprite_path("spr_kitchen_fire_ball", "spr_kitchen_fire_ball_1.png"), (40, 40), "fit"),
+    "food_warning": (sprite_path("spr_chefs_foodnotice", "spr_chefs_foodnotice_0.png"), (50, 50), "stretch"),
+    "scoreboard": (sprite_path("spr_chefs_hudscreen.png"), (250, 120), "stretch"),
+}
+
+# name -> (source gif, target size)
+GIF_MANIFEST = {
+    "cabbage": (sprite_path("spr_tenna_dance_cabbage.gif"), (300, 300)),
+    "cane": (sprite_path("spr_tenna_dance_cane.gif"), (300, 300)),
+}
+
+# food images get drawn falling (50x50) and on the player's stack (40x40)
+FOOD_SIZE = (50, 50)
+STACK_FOOD_SIZE = (40, 40)
+FOOD_SIZES = [FOOD_SIZE, STACK_FOOD_SIZE]
+
+BUNDLE_PATH = "assets.bundle"
+BUNDLE_MAGIC = b"SUMRPACK"
+BUNDLE_VERSION = 1
+BUNDLE_HEADER = "<8sII"
+BUNDLE_ALIGN = 16
+
+def food_entry_name(path, size):
+    return f"food:{os.path.basename(path)}@{size[0]}x{size[1]}"
+
+def align_up(value, alignment=BUNDLE_ALIGN):
+    return (value + alignment - 1) // alignment * alignment
+
+def bundle_data_start(index_length):
+    return align_up(struct.calcsize(BUNDLE_HEADER) + index_length)
+
+
+# Asset helpers -----------------------------------------------------------
+
+def load_and_scale_sprite(path, target_width, target_height):
+    """Load a sprite and scale it to fit within target dimensions while maintaining aspect ratio"""
+    original = pygame.image.load(path)
+    orig_width, orig_height = original.get_size()
+
+    scale_x = target_width / orig_width
+    scale_y = target_height / orig_height
+    scale = min(scale_x, scale_y)
+
+    new_width = int(orig_width * scale)
+    new_height = int(orig_height * scale)
+
+    # scale the sprite
+    scaled = pygame.transform.scale(original, (new_width, new_height))
+
+    # create a new surface with target dimensions and transparent background
+    final_surface = pygame.Surface((target_width, target_height), pygame.SRCALPHA)
+
+    # center the scaled sprite on the final surface
+    x_offset = (target_width - new_width) // 2
+    y_offset = (target_height - new_height) // 2
+    final_surface.blit(scaled, (x_offset, y_offset))
+
+    return final_surface
+
+# decodes one manifest sprite from its source file, screen_size is only used for "screen" sprites
+def decode_sprite(path, size, mode, screen_size=None):
+    if mode == "fit":
+        return load_and_scale_sprite(path, size[0], size[1])
+    if mode == "screen":
+        size = screen_size
+    return pygame.transform.scale(pygame.image.load(path), size)
+
+PALETTE_COLORKEY = 255
+
+# a frame as an 8 bit surface: up to 255 colours plus one colorkeyed index for the see-through pixels,
+# a quarter of the memory of RGBA (the gifs are pixel art, so nothing is lost but the half transparent edges)
+def palette_surface(rgba):
+    from PIL import Image
+    indexed = rgba.convert("RGB").quantize(255, method=Image.Quantize.FASTOCTREE)
+    transparent = rgba.getchannel("A").point(lambda alpha: 255 if alpha < 128 else 0)
+    indexed.paste(PALETTE_COLORKEY, mask=transparent)
+    palette = indexed.getpalette()[:255 * 3]
+    palette += [0] * (255 * 3 - len(palette)) + [255, 0, 255]
+    surface = pygame.image.fromstring(indexed.tobytes(), indexed.size, "P")
+    surface.set_palette([tuple(palette[i:i + 3]) for i in range(0, len(palette), 3)])
+    surface.set_colorkey(PALETTE_COLORKEY)
+    return surface
+
+
+# the same 8 bit surface for a frame that's already a pygame surface (the bundle keeps gifs as full colour frames)
+def palette_from_surface(surface):
+    from PIL import Image
+    surface = surface.convert_alpha()  # a colorkeyed frame's clear pixels come out with alpha 0
+    return palette_surface(Image.frombytes("RGBA", surface.get_size(), pygame.image.tobytes(surface, "RGBA")))
+
+
+# decodes every frame of a gif with PIL and scales it, returns (frames, durations in ms)
+# a frame that's the same as the one before it isn't kept, the one before just stays up for longer
+# palette=True keeps the frames as 8 bit surfaces (see palette_surface)
+def decode_gif(path, size, palette=False):
+    from PIL import Image
+    frames = []
+    durations = []
+    gif = Image.open(path)
+    frame_count = 0
+    previous = None
+    try:
+        while True:
+            rgba = gif.convert('RGBA')
+            pixels = rgba.tobytes()
+            duration = gif.info.get("duration", 0)
+            if pixels == previous:
+                durations[-1] += duration
+            else:
+                # convert PIL image to pygame surface
+                frame_surface = palette_surface(rgba) if palette else pygame.image.fromstring(pixels, gif.size, 'RGBA')
+                frames.append(pygame.transform.scale(frame_surface, size))
+                durations.append(duration)
+                previous = pixels
+            frame_count += 1
+            gif.seek(frame_count)
+    except EOFError:
+        pass  # end of gif
+    return frames, durations
+
+
+# read side of the packed bundle that asset_pipeline.py writes
+# layout: magic, version, index length, json index, then raw BGRA pixel blocks (16 byte aligned,
+# frame offsets in the index are counted from the start of the pixel data)
+class AssetBundle:
+    def __init__(self, path=BUNDLE_PATH):
+        self.file = open(path, "rb")
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, index_length = struct.unpack_from(BUNDLE_HEADER, self.data, 0)
+        if magic != BUNDLE_MAGIC or version != BUNDLE_VERSION:
+            raise ValueError(f"{path} is not a version {BUNDLE_VERSION} asset bundle")
+        header_size = struct.calcsize(BUNDLE_HEADER)
+        self.entries = json.loads(bytes(self.data[header_size:header_size + index_length]))
+        self.data_start = bundle_data_start(index_length)
+
+    @classmethod
+    def open_if_present(cls, path=BUNDLE_PATH):
+        try:
+            return cls(path)
+        except (OSError, ValueError) as e:
+            if not isinstance(e, FileNotFoundError):
+                print(f"Ignoring asset bundle {path}: {e}")
+            return None
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+    def has(self, name, size=None):
+        entry = self.entries.get(name)
+        if entry is None:
+            return False
+        return size is None or tuple(entry["frames"][0]["size"]) == tuple(size)
+
+    # turns one stored frame into a display-ready surface (needs set_mode to have run already)
+    def _frame_surface(self, entry, frame):
+        start = self.data_start + frame["offset"]
+        pixels = memoryview(self.data)[start:start + frame["length"]]
+        raw = pygame.image.frombuffer(pixels, tuple(frame["size"]), "BGRA")
+        if entry["blit"] == "opaque":
+            surface = raw.convert()
+        elif entry["blit"] == "colorkey":
+            # only fully transparent or fully opaque pixels, so a colorkey with RLE blits faster than per-pixel alpha
+            surface = raw.convert()
+            surface.set_colorkey(tuple(entry["colorkey"]), pygame.RLEACCEL)
+        else:
+            surface = raw.convert_alpha()
+        del raw
+        pixels.release()
+        return surface
+
+    def surface(self, name):
+        entry = self.entries[name]
+        return self._frame_surface(entry, entry["frames"][0])
+
+    # returns (frames, durations in ms)
+    def animation(self, name):
+        entry = self.entries[name]
+        frames = [self._frame_surface(entry, frame) for frame in entry["frames"]]
+        return frames, [frame["duration"] for frame in entry["frames"]]
+
+
+# loads one manifest sprite, from the bundle when it has a copy at the right size and from the source file otherwise
+def load_sprite(name, screen_size, bundle=None):
+    path, size, mode = SPRITE_MANIFEST[name]
+    target = screen_size if mode == "screen" else size
+    if bundle is not None and bundle.has(name, target):
+        return bundle.surface(name)
+    # convert to the display's pixel format once here, otherwise every single blit converts it again
+    surface = decode_sprite(path, size, mode, screen_size)
+    return surface.convert() if mode == "screen" else surface.convert_alpha()
+
+def load_gif_frames(name, bundle=None, palette=False):
+    path, size = GIF_MANIFEST[name]
+    if bundle is not None and bundle.has(name, size):
+        frames, durations = bundle.animation(name)
+        if palette:
+            frames = [palette_from_surface(frame) for frame in frames]
+        return frames, durations
+    return decode_gif(path, size, palette)
+
+
+# decodes assets on a thread pool (PIL, SDL_image and file reads all let go of the GIL while they work)
+# every job has a name, screens ask for the names they need and only block on those.
+# required jobs (the manifest: sprites and food images) are what the loading indicator and the wait before a round
+# count, optional ones (gifs, music) just finish whenever they finish
+class AssetLoader:
+    def __init__(self, workers=4):
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="assets")
+        self.futures = {}
+        self.required = set()  # names of the jobs the game can't start a round without
+        self.lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.finished_time = None
+        self.manifest_queued = False
+
+    def submit(self, name, function, *args, required=False):
+        future = self.pool.submit(function, *args)
+        with self.lock:
+            self.futures[name] = future
+            if required:
+                self.required.add(name)
+        future.add_done_callback(self._job_done)
+        return future
+
+    def _job_done(self, future):
+        if future.exception() is not None:
+            print(f"Error loading asset: {future.exception()}")
+        self._check_finished()
+
+    def _required_futures(self):
+        with self.lock:
+            return [self.futures[name] for name in self.required]
+
+    # records (and prints) how long the whole manifest took, once all of it is done
+    def _check_finished(self):
+        if self.finished_time is not None or not self.manifest_queued:
+            return
+        futures = self._required_futures()
+        if not all(f.done() for f in futures):
+            return
+        with self.lock:
+            if self.finished_time is not None:
+                return
+            self.finished_time = time.perf_counter()
+        print(f"Loaded {len(futures)} assets in {self.elapsed_ms(self.finished_time):.0f} ms")
+
+    def future(self, name):
+        return self.futures[name]
+
+    def ready(self, name):
+        return self.futures[name].done()
+
+    # blocks until the asset is decoded (re-raises whatever went wrong while loading it)
+    def get(self, name):
+        return self.futures[name].result()
+
+    def wait(self, names):
+        return [self.get(name) for name in names]
+
+    # how much of the required jobs is done, 0 to 1
+    def progress(self):
+        futures = self._required_futures()
+        if not futures:
+            return 1.0
+        return sum(f.done() for f in futures) / len(futures)
+
+    def all_done(self):
+        return all(f.done() for f in self._required_futures())
+
+    def elapsed_ms(self, until=None):
+        return ((until or time.perf_counter()) - self.started) * 1000
+
+    # queues the whole manifest, in the order the screens need it:
+    # background and menu gif first, then the gameplay sprites, then the rest
+    # (gifs aren't part of it, the menu's one gets asked for straight after the background)
+    def load_manifest(self, screen_size, bundle, food_images, animations=None):
+        self.submit("background", load_sprite, "background", screen_size, bundle, required=True)
+        if animations is not None:
+            animations.request("cabbage")
+        for name in SPRITE_MANIFEST:
+            if name != "background":
+                self.submit(name, load_sprite, name, screen_size, bundle, required=True)
+        self.submit("food_images", food_images.preload, IMAGE_PATHS, FOOD_SIZES, bundle, required=True)
+        self.manifest_queued = True
+        self._check_finished()
+
+
+# one decoded copy of each gif for the whole game. a gif is decoded (on the loader's threads) the first time
+# anything asks for it, after that every GIFAnimation of it on every screen shares the same frame surfaces
+# frame durations are the gif's own, a frame with none (or the too short ones browsers also ignore) gets 100 ms
+DEFAULT_FRAME_DURATION = 100
+MIN_FRAME_DURATION = 20
+
+class Animation:
+    def __init__(self, frames, durations):
+        self.frames = frames
+        self.durations = [d if d >= MIN_FRAME_DURATION else DEFAULT_FRAME_DURATION for d in durations]
+        self.ends = list(itertools.accumulate(self.durations))  # ms into the loop where each frame ends
+        self.length = self.ends[-1] if self.ends else 0
+
+    # which frame is showing t ms after the animation started
+    def frame_at(self, t):
+        if len(self.frames) < 2:
+            return 0
+        return bisect.bisect_right(self.ends, t % self.length)
+
+    # when (in ms after the start) the frame showing at t gets replaced
+    def next_change(self, t):
+        loops, into_loop = divmod(t, self.length)
+        return loops * self.length + self.ends[bisect.bisect_right(self.ends, into_loop)]
+
+
+class AnimationStore:
+    def __init__(self, loader, bundle=None, palette=False):
+        self.loader = loader
+        self.bundle = bundle
+        self.palette = palette
+        self.animations = {}
+        self.lock = threading.Lock()
+
+    def request(self, name):
+        with self.lock:
+            if "gif:" + name not in self.loader.futures:
+                self.loader.submit("gif:" + name, load_gif_frames, name, self.bundle, self.palette)
+
+    def ready(self, name):
+        self.request(name)
+        return self.loader.ready("gif:" + name)
+
+    # blocks until it's decoded. a gif that fails to load becomes a single magenta frame
+    def get(self, name):
+        animation = self.animations.get(name)
+        if animation is not None:
+            return animation
+        self.request(name)
+        try:
+            frames, durations = self.loader.get("gif:" + name)
+        except Exception as e:
+            print(f"Error loading GIF {name}: {e}")
+            fallback = pygame.Surface(GIF_MANIFEST[name][1], pygame.SRCALPHA)
+            fallback.fill((255, 0, 255))
+            frames, durations = [fallback], [0]
+        animation = self.animations[name] = Animation(frames, durations)
+        return animation
+
+
+# keeps decoded + scaled surfaces around so drawing never touches the disk
+# key is (path, (width, height)), least recently used entries are dropped once max_entries is hit
+class ImageCache:
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self.surfaces = OrderedDict()
+        self.masks = {}  # pixel masks for pixel perfect collisions, same keys as the surfaces
+        self.hits = 0
+        self.misses = 0
+
+    def _store(self, key, surface):
+        self.surfaces[key] = surface
+        self.surfaces.move_to_end(key)
+        self.masks.pop(key, None)
+        while len(self.surfaces) > self.max_entries:
+            evicted, _ = self.surfaces.popitem(last=False)
+            self.masks.pop(evicted, None)
+
+    # convert_alpha needs a display mode, so this can only run after set_mode
+    def _prepare(self, original, size):
+        return pygame.transform.scale(original, size).convert_alpha()
+
+    def get(self, path, size):
+        key = (path, size)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface
+        self.misses += 1
+        surface = self._prepare(pygame.image.load(path), size)
+        self._store(key, surface)
+        return surface
+
+    # built from the surface the first time it's asked for, then kept until the surface itself is evicted
+    def mask(self, path, size):
+        key = (path, size)
+        mask = self.masks.get(key)
+        if mask is None:
+            mask = self.masks[key] = pygame.mask.from_surface(self.get(path, size))
+        return mask
+
+    # decode every image once and scale it to all the sizes we need up front
+    # (prebuilt surfaces are taken straight from the bundle if there is one)
+    def preload(self, paths, sizes, bundle=None):
+        for path in paths:
+            original = None
+            for size in sizes:
+                name = food_entry_name(path, size)
+                if bundle is not None and bundle.has(name, size):
+                    self._store((path, size), bundle.surface(name))
+                    continue
+                if original is None:
+                    original = pygame.image.load(path)
+                self._store((path, size), self._prepare(original, size))
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
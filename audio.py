@@ -0,0 +1,99 @@
+import threading
+import numpy as np
+import pygame
+
+# Audio -----------------------------------------------------------
+# music used to go through pygame.mixer.music, which opens and starts decoding the mp3 on the spot every time
+# the screen changes. here both tracks are decoded to PCM once, on the asset loader's threads, and each plays
+# on one of two reserved channels: switching fades the old one out while the new one fades in, and all of that
+# happens in SDL's mixer thread. sound effects are made once up front and played on whatever effect channel is
+# free (there's a fixed number of them, an effect with none free is just skipped), so play() never waits
+
+MUSIC_TRACKS = {"menu": "silly_menu.mp3", "game": "game_active.mp3"}
+CROSSFADE_MS = 500
+EFFECT_CHANNELS = 8
+EFFECT_VOLUME = 0.4
+
+# name -> (notes in Hz, length of each in seconds, waveform)
+EFFECTS = {
+    "catch": ([660, 880], 0.05, "square"),
+    "throw": ([520, 390, 260], 0.04, "square"),
+    "hurt": ([110, 82], 0.12, "saw"),
+    "score": ([523, 659, 784], 0.07, "square"),
+}
+
+
+# a short chiptune style blip as an int16 array in the mixer's format, each note fading out by itself
+def synth_effect(notes, note_length, waveform, frequency, channels):
+    samples = []
+    t = np.arange(int(frequency * note_length)) / frequency
+    envelope = np.linspace(1.0, 0.0, len(t)) ** 2
+    for note in notes:
+        phase = (t * note) % 1.0
+        wave = np.sign(phase - 0.5) if waveform == "square" else 2 * phase - 1
+        samples.append(wave * envelope)
+    mono = (np.concatenate(samples) * 0.6 * 32767).astype(np.int16)
+    return np.repeat(mono[:, None], channels, axis=1)
+
+
+class AudioEngine:
+    def __init__(self, loader, tracks=MUSIC_TRACKS, effect_channels=EFFECT_CHANNELS):
+        self.loader = loader
+        self.lock = threading.Lock()
+        self.current = None  # name of the track that's playing (or will be once it's decoded)
+        self.music_channel = None
+        self.effects = {}
+        mixer = pygame.mixer.get_init()
+        self.enabled = mixer is not None
+        if not self.enabled:
+            return
+
+        # channels 0 and 1 are reserved for the music, Sound.play only ever hands out the others to effects
+        pygame.mixer.set_num_channels(2 + effect_channels)
+        pygame.mixer.set_reserved(2)
+        self.music_channels = [pygame.mixer.Channel(0), pygame.mixer.Channel(1)]
+
+        frequency, size, channels = mixer
+        if size == -16:
+            for name, (notes, note_length, waveform) in EFFECTS.items():
+                samples = synth_effect(notes, note_length, waveform, frequency, channels)
+                sound = pygame.mixer.Sound(buffer=samples.tobytes())
+                sound.set_volume(EFFECT_VOLUME)
+                self.effects[name] = sound
+        else:
+            print(f"No sound effects, the mixer isn't 16 bit ({size})")
+
+        for name, path in tracks.items():
+            loader.submit("music:" + name, pygame.mixer.Sound, path)
+
+    # switches to a track (does nothing if it's already the one playing), returns right away
+    # if it's still decoding it starts as soon as it's done, unless something else was asked for by then
+    def play_music(self, name):
+        if not self.enabled:
+            return
+        with self.lock:
+            if name == self.current:
+                return
+            self.current = name
+        self.loader.future("music:" + name).add_done_callback(lambda future: self._start_music(name))
+
+    def _start_music(self, name):
+        with self.lock:
+            if name != self.current:
+                return
+            try:
+                sound = self.loader.get("music:" + name)
+            except Exception as e:
+                print(f"Could not load music {name}: {e}")
+                return
+            old = self.music_channel
+            new = self.music_channels[1] if old is self.music_channels[0] else self.music_channels[0]
+            if old is not None:
+                old.fadeout(CROSSFADE_MS)
+            new.play(sound, loops=-1, fade_ms=CROSSFADE_MS)
+            self.music_channel = new
+
+    def play(self, effect):
+        sound = self.effects.get(effect)
+        if sound is not None:
+            sound.play()
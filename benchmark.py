@@ -0,0 +1,329 @@
+"""Frame time benchmarks for every screen, run headless with SDL's dummy video driver.
+
+usage:
+    python benchmark.py                                  # all scenarios at the default resolutions
+    python benchmark.py --save baseline.json             # keep the numbers around
+    python benchmark.py --baseline baseline.json         # compare against them, exits with 1 on a regression
+    python benchmark.py --scenarios game game_stress --resolutions 1920x1080
+    python benchmark.py --imports                        # only how long `import game` takes, per module
+    python benchmark.py --imports --import-budget 400    # exits with 1 when it takes longer than 400 ms
+
+Each (resolution, scenario) pair runs in its own process since the window size is fixed once game.bootstrap() opens it.
+The import time comes from `python -X importtime`, also in a fresh process each time (best of IMPORT_RUNS).
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+RESOLUTIONS = ["1280x720", "1920x1080", "3840x2160"]
+
+# kind "game" runs the simulation + draw_game directly, "screen" drives a menu function's own loop
+SCENARIOS = {
+    "game": {"kind": "game"},
+    "game_stress": {"kind": "game", "customers": 150, "fireballs": 150, "obstacle_fireballs": 50,
+                    "thrown_food": 40, "full_stack": True},
+    # harder difficulty sized crowds, to check the entity arrays keep up
+    "game_horde": {"kind": "game", "customers": 2000, "fireballs": 2000, "obstacle_fireballs": 1000,
+                   "thrown_food": 200, "full_stack": True},
+    "main_menu": {"kind": "screen", "function": "main_menu"},
+    "instructions": {"kind": "screen", "function": "show_instructions"},
+    "about": {"kind": "screen", "function": "show_about"},
+    "leaderboard": {"kind": "screen", "function": "show_leaderboard"},
+    "game_over": {"kind": "screen", "function": "show_game_over_screen", "args": [420]},
+}
+
+WARMUP_FRAMES = 30
+METRICS = ["frame", "update", "draw", "present"]
+
+IMPORT_RUNS = 5
+IMPORT_TOP = 15  # how many modules the import report lists
+
+
+def summarize(times_ms):
+    import numpy as np
+    values = np.array(times_ms)
+    return {
+        "frames": len(times_ms),
+        "mean": float(values.mean()),
+        "p50": float(np.percentile(values, 50)),
+        "p95": float(np.percentile(values, 95)),
+        "p99": float(np.percentile(values, 99)),
+        "max": float(values.max()),
+    }
+
+
+# Worker side (runs inside the per-scenario process) ---------------------------------------------
+
+# same idea as the keyboard: walk left and right, jump now and then, throw every couple of seconds
+def scripted_inputs(frame):
+    from simulation import Inputs
+    return Inputs(left=(frame // 40) % 2 == 0, right=(frame // 40) % 2 == 1,
+                  jump=frame % 50 == 0, throw=frame % 120 == 0)
+
+
+# keeps the requested number of entities on screen so the stress numbers stay comparable frame to frame
+def top_up_entities(sim, scenario, rng):
+    from simulation import MAX_FOOD_STACK
+    while len(sim.customers) < scenario.get("customers", 0):
+        sim.spawn_customer(x=rng.randint(0, sim.width))
+    while len(sim.fireballs) < scenario.get("fireballs", 0):
+        sim.spawn_fireball(rng.randint(0, sim.width), sim.ground_y + (sim.height//20)*2)
+    while len(sim.obstacle_fireballs) < scenario.get("obstacle_fireballs", 0):
+        sim.spawn_obstacle_fireball(rng.randint(0, sim.width), sim.ground_y + (sim.height//20)*2,
+                                    rng.choice(["left", "right"]))
+    while len(sim.thrown_foods) < scenario.get("thrown_food", 0):
+        sim.spawn_thrown_food(sim.food_source(), rng.randint(0, sim.width), rng.randint(0, sim.height))
+    if scenario.get("full_stack"):
+        while len(sim.player.food_stack) < MAX_FOOD_STACK:
+            sim.player.food_stack.append(sim.food_source())
+
+
+def bench_game(game, scenario, frames, seed):
+    import random
+    from simulation import GameSimulation, TICK_MS
+
+    game.use_menu_assets()
+    game.use_game_assets()
+    sim = GameSimulation(game.WIDTH, game.HEIGHT, seed=seed)
+    sim.masks = game.PIXEL_MASKS if game.PIXEL_COLLISION else None
+    renderer = game.DirtyRenderer(game.WIN, game.BACKGROUND_IMG)
+    rng = random.Random(seed)
+    dt = TICK_MS  # one simulation tick per drawn frame
+    times = {metric: [] for metric in METRICS}
+
+    for frame in range(WARMUP_FRAMES + frames):
+        top_up_entities(sim, scenario, rng)
+        start = time.perf_counter()
+        sim.step(dt, scripted_inputs(frame))
+        stepped = time.perf_counter()
+        game.draw_game(renderer, sim)
+        drawn = time.perf_counter()
+        renderer.present()
+        presented = time.perf_counter()
+
+        if frame >= WARMUP_FRAMES:
+            times["update"].append((stepped - start) * 1000)
+            times["draw"].append((drawn - stepped) * 1000)
+            times["present"].append((presented - drawn) * 1000)
+            times["frame"].append((presented - start) * 1000)
+        if sim.finished:
+            sim = GameSimulation(game.WIDTH, game.HEIGHT, seed=seed)
+            sim.masks = game.PIXEL_MASKS if game.PIXEL_COLLISION else None
+    return times
+
+
+# patches pygame so a screen's own while loop can be fed events and timed frame by frame,
+# once enough frames are recorded it sends ESC (to leave submenus) and then QUIT (for the rest).
+# the menus only redraw when something changes, so the frame cap is turned off, waiting for events doesn't
+# sleep and every loop gets a mouse motion event plus a redraw request: what's measured is the cost of a redraw,
+# not the pacing
+def bench_screen(game, scenario, frames):
+    import pygame
+    from assets import GIF_MANIFEST
+
+    game.MENU_FPS = None
+    game.use_menu_assets()
+    for name in GIF_MANIFEST:
+        game.ANIMATIONS.get(name)  # gifs included, loading isn't what's being measured
+    game.ASSETS.wait(list(game.ASSETS.futures))
+    total = WARMUP_FRAMES + frames
+    times = {"frame": [], "present": []}
+    state = {"frame": 0, "last_present": time.perf_counter()}
+    real_update = pygame.display.update
+    real_get = pygame.event.get
+    width, height = game.WIDTH, game.HEIGHT
+
+    def timed_update(*args):
+        before = time.perf_counter()
+        real_update(*args)
+        after = time.perf_counter()
+        if state["frame"] >= WARMUP_FRAMES:
+            times["present"].append((after - before) * 1000)
+            times["frame"].append((after - state["last_present"]) * 1000)
+        state["last_present"] = after
+        state["frame"] += 1
+
+    def scripted_events(*args, **kwargs):
+        events = real_get(*args, **kwargs)
+        frame = state["frame"]
+        if frame >= total:
+            return [pygame.event.Event(pygame.KEYDOWN, key=pygame.K_ESCAPE, unicode="", mod=0),
+                    pygame.event.Event(pygame.QUIT)]
+        events.append(pygame.event.Event(pygame.MOUSEMOTION, pos=scripted_mouse_pos(), rel=(0, 3), buttons=(0, 0, 0)))
+        if frame % 10 == 0:
+            # type something so the game over name box has text to redraw
+            events.append(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_a, unicode="a", mod=0))
+        return events
+
+    # sweep the mouse down the middle of the screen so the menu hover highlight gets drawn too
+    def scripted_mouse_pos():
+        return (width // 2, height // 2 - 40 + (state["frame"] * 3) % 260)
+
+    real_wait = game.FrameScheduler.wait
+
+    def wait_and_redraw(scheduler):
+        events = real_wait(scheduler)
+        scheduler.request_redraw()
+        return events
+
+    game.FrameScheduler.wait = wait_and_redraw
+    pygame.display.update = timed_update
+    pygame.event.get = scripted_events
+    pygame.event.wait = lambda *args, **kwargs: pygame.event.Event(pygame.NOEVENT)
+    pygame.mouse.get_pos = scripted_mouse_pos
+    try:
+        getattr(game, scenario["function"])(*scenario.get("args", []))
+    except SystemExit:
+        pass
+    return times
+
+
+def run_worker(scenario_name, resolution, frames, seed, output):
+    os.environ["GAME_RESOLUTION"] = resolution
+    import game
+    game.bootstrap()
+    scenario = SCENARIOS[scenario_name]
+    if scenario["kind"] == "game":
+        times = bench_game(game, scenario, frames, seed)
+    else:
+        times = bench_screen(game, scenario, frames)
+    result = {metric: summarize(values) for metric, values in times.items() if values}
+    with open(output, "w") as file:
+        json.dump(result, file)
+
+
+# Driver side ---------------------------------------------
+
+def run_all(scenarios, resolutions, frames, seed):
+    results = {}
+    env = dict(os.environ, SDL_VIDEODRIVER="dummy", SDL_AUDIODRIVER="dummy")
+    for resolution in resolutions:
+        for name in scenarios:
+            fd, output = tempfile.mkstemp(suffix=".json")
+            os.close(fd)
+            try:
+                command = [sys.executable, os.path.abspath(__file__), "--worker", name, "--resolutions", resolution,
+                           "--frames", str(frames), "--seed", str(seed), "--output", output]
+                completed = subprocess.run(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+                if completed.returncode != 0:
+                    print(f"{resolution}/{name} failed:\n{completed.stderr}")
+                    continue
+                with open(output) as file:
+                    results[f"{resolution}/{name}"] = json.load(file)
+            finally:
+                os.remove(output)
+            frame_stats = results[f"{resolution}/{name}"]["frame"]
+            print(f"{resolution:>10} {name:<14} p50 {frame_stats['p50']:7.2f} ms  p95 {frame_stats['p95']:7.2f} ms  "
+                  f"p99 {frame_stats['p99']:7.2f} ms  max {frame_stats['max']:7.2f} ms")
+    return results
+
+
+# -X importtime prints "import time: self | cumulative | name" for every module (microseconds, nested ones indented),
+# returns the cumulative time of the top level module in ms and the modules that took longest by themselves
+def parse_importtime(stderr, module):
+    total, modules = None, []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # the header line
+        self_us, cumulative_us, name = int(fields[0]), int(fields[1]), fields[2]
+        modules.append((name.strip(), self_us / 1000))
+        if name.strip() == module and not name.startswith("  "):
+            total = cumulative_us / 1000
+    modules.sort(key=lambda row: row[1], reverse=True)
+    return total, modules
+
+
+# how long `import module` takes in a fresh interpreter, the fastest of runs (the rest is disk cache and noise)
+def measure_imports(module="game", runs=IMPORT_RUNS):
+    env = dict(os.environ, SDL_VIDEODRIVER="dummy", SDL_AUDIODRIVER="dummy", PYGAME_HIDE_SUPPORT_PROMPT="1")
+    best = None
+    for _ in range(runs):
+        completed = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], env=env,
+                                   cwd=os.path.dirname(os.path.abspath(__file__)), stdout=subprocess.DEVNULL,
+                                   stderr=subprocess.PIPE, text=True)
+        if completed.returncode != 0:
+            raise RuntimeError(f"import {module} failed:\n{completed.stderr}")
+        total, modules = parse_importtime(completed.stderr, module)
+        if best is None or total < best["total"]:
+            best = {"total": total, "modules": dict(modules[:IMPORT_TOP])}
+    return best
+
+
+def print_imports(imports):
+    print(f"import game: {imports['total']:.1f} ms (fastest of {IMPORT_RUNS}), slowest modules by their own time:")
+    for name, ms in imports["modules"].items():
+        print(f"  {ms:8.2f} ms  {name}")
+
+
+# a metric regresses when its p95 grows by more than the tolerance (and by more than min_ms, to ignore noise)
+def compare(results, baseline, tolerance, min_ms=0.5):
+    regressions = []
+    for key, metrics in results.items():
+        for metric, stats in metrics.items():
+            old = baseline.get("results", {}).get(key, {}).get(metric)
+            if old is None:
+                continue
+            change = stats["p95"] - old["p95"]
+            if change > min_ms and stats["p95"] > old["p95"] * (1 + tolerance):
+                regressions.append(f"{key} {metric}: p95 {old['p95']:.2f} ms -> {stats['p95']:.2f} ms")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark frame times under the SDL dummy video driver")
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument("--resolutions", nargs="+", default=RESOLUTIONS)
+    parser.add_argument("--frames", type=int, default=300, help="timed frames per scenario (after warmup)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--save", help="write the results to this json file")
+    parser.add_argument("--baseline", help="compare against a json file written by --save")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95 slowdown before failing (0.2 = 20%%)")
+    parser.add_argument("--imports", action="store_true", help="only measure how long importing the game takes")
+    parser.add_argument("--import-budget", type=float, help="fail when importing the game takes longer than this (ms)")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--output", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.resolutions[0], args.frames, args.seed, args.output)
+        sys.exit(0)
+
+    imports = measure_imports()
+    print_imports(imports)
+    results = {} if args.imports else run_all(args.scenarios, args.resolutions, args.frames, args.seed)
+    report = {
+        "meta": {"python": platform.python_version(), "platform": platform.platform(),
+                 "frames": args.frames, "seed": args.seed, "time": time.strftime("%Y-%m-%d %H:%M:%S")},
+        "imports": imports,
+        "results": results,
+    }
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(report, file, indent=2)
+        print(f"Saved results to {args.save}")
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, args.tolerance)
+        old = baseline.get("imports")
+        if old and imports["total"] > old["total"] * (1 + args.tolerance) and imports["total"] - old["total"] > 5:
+            regressions.append(f"import game: {old['total']:.1f} ms -> {imports['total']:.1f} ms")
+        if regressions:
+            print("Regressions:")
+            for line in regressions:
+                print("  " + line)
+            sys.exit(1)
+        print("No regressions against " + args.baseline)
+
+    if args.import_budget is not None and imports["total"] > args.import_budget:
+        print(f"import game took {imports['total']:.1f} ms, over the {args.import_budget:.0f} ms budget")
+        sys.exit(1)
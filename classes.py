@@ -1,9 +1,8 @@
-from PIL import Image
 import numpy as np
 import random
-from sklearn.linear_model import LinearRegression
-import pandas as pd
-from linear_regression import *
+import threading
+from collections import deque
+from linear_regression import get_model
 
 # List of image paths
 IMAGE_PATHS = [f"sometimes_food/img{i}.png" for i in range(10)]
@@ -20,9 +19,91 @@ class Food:
                 self.calories = random.randint(100, 499)
 
         
-        # Load model and predict fat content
-        model = load_model()
-        self.predicted_fat = predicted_fat if predicted_fat is not None else model.predict([[self.calories]])[0]
+        # predict fat content with the shared model (fitted once per dataset, not per food)
+        if predicted_fat is not None:
+            self.predicted_fat = predicted_fat
+        else:
+            self.predicted_fat = get_model().predict([[self.calories]])[0]
         
         # Set is_healthy based on predicted fat threshold
-        self.is_healthy = is_healthy if is_healthy is not None else self.predicted_fat < 20
\ No newline at end of file
+        self.is_healthy = is_healthy if is_healthy is not None else self.predicted_fat < 20
+
+
+# makes n foods at once: calories are drawn for the whole batch (same 1 in 3 chance of a high calorie food)
+# and the fat is predicted in one vectorized call instead of once per food
+def generate_foods(n, rng=None):
+    if rng is None:
+        rng = np.random.default_rng()
+    high_calorie = rng.integers(1, 4, size=n) == 3
+    calories = np.where(high_calorie, rng.integers(500, 701, size=n), rng.integers(100, 500, size=n))
+    predicted_fat = get_model().predict_calories(calories)
+    is_healthy = predicted_fat < 20
+    path_indexes = rng.integers(0, len(IMAGE_PATHS), size=n)
+
+    return [
+        Food(IMAGE_PATHS[path_indexes[i]], int(calories[i]), float(predicted_fat[i]), bool(is_healthy[i]))
+        for i in range(n)
+    ]
+
+
+# ring buffer of ready-made foods, topped up by a background thread so the game loop never runs model code
+# (background=False skips the thread and refills inline, for headless runs that want no threads at all)
+# foods are always made in batches of the same size, so a seed gives the same foods in the same order however
+# the refills happen to be timed (a recorded round replays headless with the exact same food)
+class FoodPool:
+    def __init__(self, size=32, refill_below=8, seed=None, background=True):
+        self.size = size
+        self.refill_below = refill_below
+        self.batch = size - refill_below
+        self.rng = np.random.default_rng(seed)
+        self.foods = deque(maxlen=size)
+        self.lock = threading.Lock()
+        self.refill_needed = threading.Event()
+        self.thread = None
+        if background:
+            self.refill_needed.set()
+            self.thread = threading.Thread(target=self._refill_loop, daemon=True)
+            self.thread.start()
+
+    def _refill(self):
+        with self.lock:
+            while self.size - len(self.foods) >= self.batch:
+                self.foods.extend(generate_foods(self.batch, self.rng))
+
+    def _refill_loop(self):
+        while True:
+            self.refill_needed.wait()
+            self.refill_needed.clear()
+            self._refill()
+
+    # starts the food sequence over from a seed (each round gets its own, see replay.py)
+    def reseed(self, seed):
+        with self.lock:
+            self.rng = np.random.default_rng(seed)
+            self.foods.clear()
+        if self.thread is not None:
+            self.refill_needed.set()
+
+    # everything that decides which foods come next (for snapshot.py), and putting it back
+    def get_state(self):
+        with self.lock:
+            return self.rng.bit_generator.state, list(self.foods)
+
+    def set_state(self, state):
+        rng_state, foods = state
+        with self.lock:
+            self.rng.bit_generator.state = rng_state
+            self.foods.clear()
+            self.foods.extend(foods)
+
+    def get(self):
+        with self.lock:
+            food = self.foods.popleft() if self.foods else None
+            running_low = len(self.foods) < self.refill_below
+        if running_low and self.thread is not None:
+            self.refill_needed.set()
+        if food is None:
+            # pool ran dry (right after startup, or always without a background thread), refill on the spot
+            self._refill()
+            return self.get()
+        return food
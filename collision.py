@@ -0,0 +1,213 @@
+import numpy as np
+
+# Collision -----------------------------------------------------------
+# broadphase is sweep and prune along x: every layer keeps its boxes sorted by left edge, so for any box the only
+# ones that can overlap it have a left edge in (its left - the layer's widest box, its right), which searchsorted
+# finds without looking at the rest. the narrowphase then runs the colliderect test on just those candidates.
+# boxes are integer (left, top, right, bottom) arrays, the same thing EntityStore.hitboxes() gives back.
+# a layer with only a few boxes (most of them, most of the time) skips all of that and checks its boxes one by one
+# in plain python, the same way the old nested loops did: for a handful of boxes numpy's overhead per call costs
+# more than the whole check
+
+SMALL_LAYER = 32  # fewer boxes than this are checked one by one instead of swept
+
+
+# the colliderect rule for whole arrays at once. zero sized boxes never collide (same as pygame), layers drop
+# them up front so this only has to compare edges
+def overlaps(a_left, a_top, a_right, a_bottom, b_left, b_top, b_right, b_bottom):
+    return (a_left < b_right) & (b_left < a_right) & (a_top < b_bottom) & (b_top < a_bottom)
+
+
+def as_list(values):
+    return values.tolist() if isinstance(values, np.ndarray) else list(values)
+
+
+# one group of boxes, sorted for the sweep. indices handed back are always the original (unsorted) ones
+# valid can leave boxes out (entities that were killed earlier in the frame and are only dropped at the end of it)
+class Layer:
+    def __init__(self, left, top, right, bottom, valid=None):
+        self.count = len(left)
+        self.order = None
+        self.boxes = None  # (index, left, top, right, bottom) in index order, for small layers
+        if self.count < SMALL_LAYER:
+            self._keep(zip(as_list(left), as_list(top), as_list(right), as_list(bottom)),
+                       None if valid is None else as_list(valid))
+        else:
+            self._sort(np.asarray(left, np.int32), np.asarray(top, np.int32),
+                       np.asarray(right, np.int32), np.asarray(bottom, np.int32), valid)
+
+    def _keep(self, boxes, valid=None):
+        self.boxes = [(i, left, top, right, bottom) for i, (left, top, right, bottom) in enumerate(boxes)
+                      if right > left and bottom > top and (valid is None or valid[i])]
+
+    def _sort(self, left, top, right, bottom, valid=None):
+        usable = (right > left) & (bottom > top)
+        if valid is not None:
+            usable &= valid
+        boxes = np.flatnonzero(usable)
+        self.order = boxes[np.argsort(left[boxes], kind="stable")]  # stable sort is quick when last frame's order still holds
+        self.left = left[self.order]
+        self.top = top[self.order]
+        self.right = right[self.order]
+        self.bottom = bottom[self.order]
+        self.max_width = int((self.right - self.left).max()) if len(self.order) else 0
+
+    # a small layer only gets the sorted arrays when it's checked against a big one
+    def sorted(self):
+        if self.order is None:
+            columns = list(zip(*self.boxes)) if self.boxes else [[]] * 5
+            index, left, top, right, bottom = (np.array(column, np.int64) for column in columns)
+            self._sort(left, top, right, bottom)
+            self.order = index[self.order]
+        return self
+
+    # from a list of (left, top, right, bottom) tuples, without going through arrays when there are only a few
+    @classmethod
+    def from_boxes(cls, boxes, valid=None):
+        if len(boxes) >= SMALL_LAYER:
+            return cls(*np.array(boxes, np.int64).T, None if valid is None else np.asarray(valid, bool))
+        layer = cls.__new__(cls)
+        layer.count = len(boxes)
+        layer.order = None
+        layer._keep(boxes, valid)
+        return layer
+
+    @classmethod
+    def from_rects(cls, rects):
+        return cls.from_boxes([(r.left, r.top, r.right, r.bottom) for r in rects])
+
+    # the sorted positions whose left edge is in (left - max_width, right), for every query box
+    def sweep(self, left, right):
+        start = np.searchsorted(self.left, np.asarray(left) - self.max_width, side="right")
+        end = np.searchsorted(self.left, right, side="left")
+        return start, np.maximum(end, start)
+
+    # like Rect.collidelistall: original indices of every box overlapping rect, in order
+    def collidelistall(self, rect):
+        if rect.width <= 0 or rect.height <= 0:
+            return np.zeros(0, np.int64)
+        if self.boxes is not None:
+            return np.array([i for i, left, top, right, bottom in self.boxes
+                             if left < rect.right and rect.left < right and top < rect.bottom and rect.top < bottom],
+                            np.int64)
+        if not len(self.order):
+            return np.zeros(0, np.int64)
+        start, end = self.sweep(rect.left, rect.right)
+        s = slice(int(start), int(end))
+        hit = overlaps(self.left[s], self.top[s], self.right[s], self.bottom[s],
+                       rect.left, rect.top, rect.right, rect.bottom)
+        return np.sort(self.order[s][hit])
+
+    def __len__(self):
+        return self.count
+
+
+EMPTY_LAYER = Layer([], [], [], [])
+
+
+# every overlapping (a, b) pair between two small layers, in nested loop order
+def small_pairs(a, b):
+    return [(i, j) for i, a_left, a_top, a_right, a_bottom in a.boxes
+            for j, b_left, b_top, b_right, b_bottom in b.boxes
+            if a_left < b_right and b_left < a_right and a_top < b_bottom and b_top < a_bottom]
+
+
+# every (a, b) pair the sweep can't rule out, as positions in each layer's sorted arrays
+def candidate_pairs(a, b):
+    a, b = a.sorted(), b.sorted()
+    if not len(a.order) or not len(b.order):
+        return np.zeros(0, np.int64), np.zeros(0, np.int64)
+    start, end = b.sweep(a.left, a.right)
+    counts = end - start
+    a_sorted = np.repeat(np.arange(len(a.order)), counts)
+    # position of each pair inside its query's range, added to where that range starts
+    b_sorted = np.repeat(start - (np.cumsum(counts) - counts), counts) + np.arange(int(counts.sum()))
+    return a_sorted, b_sorted
+
+
+# narrowphase on the candidates, gives back which of them really overlap
+def narrowphase(a, b, a_sorted, b_sorted):
+    return overlaps(a.left[a_sorted], a.top[a_sorted], a.right[a_sorted], a.bottom[a_sorted],
+                    b.left[b_sorted], b.top[b_sorted], b.right[b_sorted], b.bottom[b_sorted])
+
+
+# every overlapping (a, b) pair as two arrays of original indices, sorted by a's index then b's
+# (the order nested loops over the two lists would find them in)
+def colliding_pairs(a, b):
+    if a.boxes is not None and b.boxes is not None:
+        pairs = small_pairs(a, b)
+        return np.array([i for i, _ in pairs], np.int64), np.array([j for _, j in pairs], np.int64)
+    a_sorted, b_sorted = candidate_pairs(a, b)
+    hit = narrowphase(a, b, a_sorted, b_sorted)
+    a_index = a.order[a_sorted[hit]]
+    b_index = b.order[b_sorted[hit]]
+    order = np.lexsort((b_index, a_index))
+    return a_index[order], b_index[order]
+
+
+# just the pair colliding_pairs would list first, or None. skips sorting every hit when only the first one matters
+def first_colliding_pair(a, b):
+    if a.boxes is not None and b.boxes is not None:
+        for i, a_left, a_top, a_right, a_bottom in a.boxes:
+            for j, b_left, b_top, b_right, b_bottom in b.boxes:
+                if a_left < b_right and b_left < a_right and a_top < b_bottom and b_top < a_bottom:
+                    return i, j
+        return None
+    a_sorted, b_sorted = candidate_pairs(a, b)
+    hit = narrowphase(a, b, a_sorted, b_sorted)
+    if not hit.any():
+        return None
+    key = a.order[a_sorted[hit]] * b.count + b.order[b_sorted[hit]]
+    first = int(key.min())
+    return first // b.count, first % b.count
+
+
+# the layers for one round. each one is rebuilt right after the things in it move, so the queries always
+# see this frame's positions
+class CollisionWorld:
+    def __init__(self):
+        self.layers = {}
+
+    def set_layer(self, name, left, top, right, bottom, valid=None):
+        self.layers[name] = Layer(left, top, right, bottom, valid)
+        return self.layers[name]
+
+    # sprite=True uses the whole sprite instead of the tuned hitbox (for when pixel masks make the final call)
+    def set_store(self, name, store, sprite=False):
+        if not store.count:
+            self.layers[name] = EMPTY_LAYER  # most kinds are empty most of the time, nothing to build
+            return EMPTY_LAYER
+        alive = store.column("alive")
+        if len(store) < SMALL_LAYER:
+            self.layers[name] = Layer.from_boxes(store.hitbox_list(sprite), alive.tolist())
+            return self.layers[name]
+        boxes = store.sprite_boxes() if sprite else store.hitboxes()
+        return self.set_layer(name, *boxes, valid=alive)
+
+    def set_rects(self, name, rects):
+        self.layers[name] = Layer.from_rects(rects)
+        return self.layers[name]
+
+    def pairs(self, a, b):
+        return colliding_pairs(self.layers[a], self.layers[b])
+
+    def first_pair(self, a, b):
+        return first_colliding_pair(self.layers[a], self.layers[b])
+
+    def collidelistall(self, name, rect):
+        return self.layers[name].collidelistall(rect)
+
+
+# optional pixel perfect hits on top of the rect tests: pygame.mask masks made once from the sprites
+# (built in game.use_game_assets), only ever checked for pairs whose rects already overlap
+class PixelMasks:
+    def __init__(self, player, customers, fireball, food):
+        self.player = player  # sprite name (Player.get_sprite_name) -> Mask
+        self.customers = customers  # one Mask per customer animation frame
+        self.fireball = fireball
+        self.food = food  # function: food image path -> Mask (FOOD_SIZE)
+
+    @staticmethod
+    def overlap(mask_a, position_a, mask_b, position_b):
+        offset = (int(position_b[0]) - int(position_a[0]), int(position_b[1]) - int(position_a[1]))
+        return mask_a.overlap(mask_b, offset) is not None
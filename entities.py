@@ -0,0 +1,213 @@
+from itertools import compress, repeat
+import numpy as np
+
+# Entity store -----------------------------------------------------------
+# every customer / fireball / thrown food of one kind is a row in a set of numpy arrays instead of its own object,
+# so moving all of them (or checking all of their hitboxes) is one array operation per field, not a python loop.
+# rows that die during a frame are just flagged, compact() drops all of them in one go at the end.
+# rows move around when others are dropped, so anything that needs to hold on to an entity keeps its handle
+# instead: a slot number plus a generation that goes up every time the slot is reused, so an old handle can
+# never point at whatever got spawned into its slot later. slots and array space are recycled, a round that's
+# been going for a while spawns without allocating anything
+
+COLUMNS = [
+    ("x", np.float64), ("y", np.float64),
+    ("prev_x", np.float64), ("prev_y", np.float64),  # position one step ago, for drawing in between steps
+    ("vx", np.float64), ("vy", np.float64),  # units per second
+    ("width", np.float64), ("height", np.float64),
+    ("hit_x", np.float64), ("hit_y", np.float64), ("hit_w", np.float64), ("hit_h", np.float64),  # hitbox, relative to x, y
+    ("spawn_time", np.float64),  # ms, animations are worked out from this and the shared clock
+    ("slot", np.int64),  # which handle slot points at this row
+]
+
+SLOT_BITS = 32
+
+
+class EntityStore:
+    def __init__(self, kind, capacity=64):
+        self.kind = kind
+        self.count = 0
+        self.columns = {name: np.zeros(capacity, dtype) for name, dtype in COLUMNS}
+        self.columns["alive"] = np.ones(capacity, bool)
+        self.payload = []  # python objects that go with each row (the Food for thrown food), None otherwise
+        self.slot_rows = np.full(capacity, -1, np.int64)  # slot -> row it points at (-1 when free)
+        self.generations = np.zeros(capacity, np.int64)  # slot -> how many times it's been freed
+        self.free_slots = list(range(capacity - 1, -1, -1))  # popped from the end, so slot 0 goes first
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def capacity(self):
+        return len(self.columns["x"])
+
+    # doubles every array, so spawning thousands of things only reallocates a handful of times
+    def grow(self, capacity=None):
+        capacity = capacity or self.capacity * 2
+        for name, array in self.columns.items():
+            bigger = np.zeros(capacity, array.dtype) if name != "alive" else np.ones(capacity, bool)
+            bigger[:self.count] = array[:self.count]
+            self.columns[name] = bigger
+        old_capacity = len(self.slot_rows)
+        self.slot_rows = np.concatenate([self.slot_rows, np.full(capacity - old_capacity, -1, np.int64)])
+        self.generations = np.concatenate([self.generations, np.zeros(capacity - old_capacity, np.int64)])
+        self.free_slots[:0] = range(capacity - 1, old_capacity - 1, -1)
+
+    # adds a row and returns the new entity's handle
+    # hitbox is (x offset, y offset, width, height), the whole sprite if left out
+    def spawn(self, x, y, vx=0, vy=0, width=0, height=0, hitbox=None, spawn_time=0, payload=None):
+        if self.count == self.capacity:
+            self.grow()
+        i = self.count
+        slot = self.free_slots.pop()
+        hit_x, hit_y, hit_w, hit_h = hitbox if hitbox is not None else (0, 0, width, height)
+        values = {"x": x, "y": y, "prev_x": x, "prev_y": y, "vx": vx, "vy": vy, "width": width, "height": height, "hit_x": hit_x, "hit_y": hit_y,
+                  "hit_w": hit_w, "hit_h": hit_h, "spawn_time": spawn_time, "slot": slot, "alive": True}
+        for name, value in values.items():
+            self.columns[name][i] = value
+        self.payload.append(payload)
+        self.slot_rows[slot] = i
+        self.count += 1
+        return int(self.generations[slot]) << SLOT_BITS | slot
+
+    # the row a handle points at right now, or None if that entity is gone (or dies at the end of this frame)
+    def row(self, handle):
+        slot = handle & ((1 << SLOT_BITS) - 1)
+        if slot >= len(self.slot_rows) or self.generations[slot] != handle >> SLOT_BITS:
+            return None
+        row = int(self.slot_rows[slot])
+        if row < 0 or not self.columns["alive"][row]:
+            return None
+        return row
+
+    def handle(self, row):
+        slot = int(self.columns["slot"][row])
+        return int(self.generations[slot]) << SLOT_BITS | slot
+
+    # removes the entity at the end of the frame (does nothing if it's already gone)
+    def remove(self, handle):
+        row = self.row(handle)
+        if row is not None:
+            self.columns["alive"][row] = False
+
+    # the live part of a column (a view, writing to it changes the store)
+    def column(self, name):
+        return self.columns[name][:self.count]
+
+    # dt seconds of movement for every row
+    def move(self, dt):
+        n = self.count
+        self.columns["x"][:n] += self.columns["vx"][:n] * dt
+        self.columns["y"][:n] += self.columns["vy"][:n] * dt
+
+    def save_previous(self):
+        n = self.count
+        self.columns["prev_x"][:n] = self.columns["x"][:n]
+        self.columns["prev_y"][:n] = self.columns["y"][:n]
+
+    # where to draw every row, alpha of the way from the previous step to the current one
+    def positions(self, alpha=1.0):
+        if alpha == 1.0:
+            return self.x, self.y
+        return self.prev_x + (self.x - self.prev_x) * alpha, self.prev_y + (self.y - self.prev_y) * alpha
+
+    # hitboxes as integer left, top, right, bottom arrays (truncated the same way pygame.Rect truncates floats)
+    def hitboxes(self):
+        left = np.trunc(self.x + self.hit_x).astype(np.int64)
+        top = np.trunc(self.y + self.hit_y).astype(np.int64)
+        return left, top, left + self.hit_w.astype(np.int64), top + self.hit_h.astype(np.int64)
+
+    # the whole sprite as integer boxes, for when pixel masks make the final call instead of the hitbox
+    def sprite_boxes(self):
+        left = np.trunc(self.x).astype(np.int64)
+        top = np.trunc(self.y).astype(np.int64)
+        return left, top, left + self.width.astype(np.int64), top + self.height.astype(np.int64)
+
+    # the same boxes as a list of (left, top, right, bottom) tuples, quicker than the arrays for a handful of rows
+    def hitbox_list(self, sprite=False):
+        if not self.count:
+            return []
+        if sprite:
+            boxes = zip(repeat(0), repeat(0), self.width.tolist(), self.height.tolist())
+        else:
+            boxes = zip(self.hit_x.tolist(), self.hit_y.tolist(), self.hit_w.tolist(), self.hit_h.tolist())
+        hitboxes = []
+        for x, y, (hit_x, hit_y, hit_w, hit_h) in zip(self.x.tolist(), self.y.tolist(), boxes):
+            left, top = int(x + hit_x), int(y + hit_y)
+            hitboxes.append((left, top, left + int(hit_w), top + int(hit_h)))
+        return hitboxes
+
+    # ms since each row spawned
+    def age(self, now):
+        return now - self.spawn_time
+
+    # current animation frame of every row: frame_time ms per frame, looping over frames
+    # (counted from each row's own spawn time, so entities of one kind don't all animate in lockstep)
+    def animation_frame(self, now, frame_time, frames):
+        return (self.age(now) // frame_time).astype(np.int64) % frames
+
+    # flags rows (an index, index array or bool mask) to be dropped by the next compact()
+    def kill(self, which):
+        self.column("alive")[which] = False
+
+    # slots whose rows are going away can be handed out again, but never with the same generation
+    def _free(self, slots):
+        self.slot_rows[slots] = -1
+        self.generations[slots] += 1
+        self.free_slots.extend(slots.tolist())
+
+    # drops every row that was killed since the last compact in one pass, keeping the order of the rest
+    # (throw order and spawn order decide who gets hit first, so no swapping the last row into the gap)
+    def compact(self):
+        keep = self.column("alive").copy()  # copied, the alive column itself gets compacted below
+        n = int(keep.sum())
+        if n == self.count:
+            return
+        self._free(self.column("slot")[~keep])
+        for array in self.columns.values():
+            array[:n] = array[:self.count][keep]
+        self.columns["alive"][:n] = True
+        self.payload = list(compress(self.payload, keep.tolist()))
+        self.count = n
+        self.slot_rows[self.column("slot")] = np.arange(n)
+
+    # the live rows plus the slot bookkeeping as raw bytes (for snapshot.py), a few hundred bytes for a normal round
+    def get_state(self):
+        return {
+            "capacity": self.capacity,
+            "count": self.count,
+            "rows": b"".join(array[:self.count].tobytes() for array in self.columns.values()),
+            "payload": list(self.payload),
+            "generations": self.generations.tobytes(),
+            "free_slots": list(self.free_slots),
+        }
+
+    def set_state(self, state):
+        capacity, count = state["capacity"], state["count"]
+        if capacity != self.capacity:  # the slot arrays come back at this size, so the columns have to match
+            self.columns = {name: np.zeros(capacity, array.dtype) if name != "alive" else np.ones(capacity, bool)
+                            for name, array in self.columns.items()}
+        offset = 0
+        for array in self.columns.values():
+            array[:count] = np.frombuffer(state["rows"], array.dtype, count, offset)
+            offset += count * array.itemsize
+        self.count = count
+        self.payload = list(state["payload"])
+        self.generations = np.frombuffer(state["generations"], np.int64).copy()
+        self.slot_rows = np.full(capacity, -1, np.int64)  # rebuilt from the slot column instead of being saved
+        self.slot_rows[self.column("slot")] = np.arange(count)
+        self.free_slots = list(state["free_slots"])
+
+
+# store.x, store.y, ... -> live view of that column (assigning writes into it, so store.x -= 3 works)
+def _column_property(name):
+    def get(self):
+        return self.columns[name][:self.count]
+
+    def set(self, value):
+        self.columns[name][:self.count] = value
+    return property(get, set)
+
+
+for _name, _ in COLUMNS:
+    setattr(EntityStore, _name, _column_property(_name))
@@ -1,459 +1,292 @@
-import pygame
+import time
+STARTUP_TIME = time.perf_counter() # used to report how long it takes to get the menu on screen
+
+import os
+import functools
 import random
-import csv
-from classes import *
-from PIL import Image
+import sqlite3
+import pygame
+from classes import FoodPool, IMAGE_PATHS
+from assets import (AnimationStore, AssetBundle, AssetLoader, ImageCache, FOOD_SIZE, FOOD_SIZES,
+                    STACK_FOOD_SIZE)
+from audio import AudioEngine
+from simulation import FixedTimestep, GameSimulation, Inputs, PLAYER_WIDTH, TICK_RATE
+from perf import FrameProfiler, NULL_PROFILER, draw_overlay
+from rendering import DirtyRenderer, Hud
+from collision import PixelMasks
+from leaderboard import Leaderboard, ScoreSaver
+from replay import Recorder, seek
+from snapshot import SnapshotBuffer
+from ui import FONTS, Label, MenuOption, FrameScheduler, translucent_panel
 
 # General game setup -----------------------------------------------------------
-
-pygame.init()
-pygame.mixer.init()  # enables sound
-
-screen_info = pygame.display.Info() # player's screen size
-WIDTH, HEIGHT = screen_info.current_w, screen_info.current_h
-WIN = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Summer Project")
-
-FPS = 60
-FONT = pygame.font.SysFont("arial", 24)
-HUD_FONT = pygame.font.SysFont("arial", 48)
-MENU_FONT = pygame.font.SysFont("arial", 64)
-
-
-# Load images
-BACKGROUND_IMG = pygame.image.load("new_sprites\\spr_chefs_BG\\spr_chefs_BG_0.png")
-BACKGROUND_IMG = pygame.transform.scale(BACKGROUND_IMG, (WIDTH, HEIGHT))
-
-def load_and_scale_sprite(path, target_width, target_height):
-    """Load a sprite and scale it to fit within target dimensions while maintaining aspect ratio"""
-    original = pygame.image.load(path)
-    orig_width, orig_height = original.get_size()
-    
-    scale_x = target_width / orig_width
-    scale_y = target_height / orig_height
-    scale = min(scale_x, scale_y)
-    
-    new_width = int(orig_width * scale)
-    new_height = int(orig_height * scale)
-    
-    # scale the sprite
-    scaled = pygame.transform.scale(original, (new_width, new_height))
-    
-    # create a new surface with target dimensions and transparent background
-    final_surface = pygame.Surface((target_width, target_height), pygame.SRCALPHA)
-    
-    # center the scaled sprite on the final surface
-    x_offset = (target_width - new_width) // 2
-    y_offset = (target_height - new_height) // 2
-    final_surface.blit(scaled, (x_offset, y_offset))
-    
-    return final_surface
-
-# Player sprites
-PLAYER_WIDTH, PLAYER_HEIGHT = 70, 120
-PLAYER_SPRITES = {
-    "idle": load_and_scale_sprite("new_sprites\\spr_kris_chef_default.png", PLAYER_WIDTH, PLAYER_HEIGHT),
-    "walk_left": load_and_scale_sprite("new_sprites\\spr_kris_chef_walk\\spr_kris_chef_walk_0.png", PLAYER_WIDTH, PLAYER_HEIGHT),
-    "walk_right": load_and_scale_sprite("new_sprites\\spr_kris_chef_walk\\spr_kris_chef_walk_1.png", PLAYER_WIDTH, PLAYER_HEIGHT),
-    "jump": load_and_scale_sprite("new_sprites\\spr_kris_chef_jump.png", PLAYER_WIDTH, PLAYER_HEIGHT),
-    "hit": load_and_scale_sprite("new_sprites\\spr_chefs_kris_stun\\spr_chefs_kris_stun_0.png", PLAYER_WIDTH, PLAYER_HEIGHT),
-    "stunned": load_and_scale_sprite("new_sprites\\spr_chefs_kris_stun\\spr_chefs_kris_stun_1.png", PLAYER_WIDTH, PLAYER_HEIGHT),
-    "throw_start": load_and_scale_sprite("new_sprites\\spr_chefs_kris_throw\\spr_chefs_kris_throw_0.png", PLAYER_WIDTH, PLAYER_HEIGHT),
-    "throw": load_and_scale_sprite("new_sprites\\spr_chefs_kris_throw\\spr_chefs_kris_throw_1.png", PLAYER_WIDTH, PLAYER_HEIGHT),
-}
-
-# Customer sprites
-CUSTOMER_SPRITES = [
-    load_and_scale_sprite("new_sprites\\spr_shadowman_run3\\spr_shadowman_run3_1.png", 100, 120),
-    load_and_scale_sprite("new_sprites\\spr_shadowman_run3\\spr_shadowman_run3_0.png", 100, 120),
-]
-
-# Fireball sprite
-FIREBALL_SPRITE = load_and_scale_sprite(
-    "new_sprites\\spr_kitchen_fire_ball\\spr_kitchen_fire_ball_1.png",
-    40, 40
-)
-
-# Food warning sprite
-FOOD_WARNING_SPRITE = pygame.transform.scale(
-    pygame.image.load("new_sprites\\spr_chefs_foodnotice\\spr_chefs_foodnotice_0.png"),
-    (50, 50) 
-)
-
-# scoreboard sprite and dimensions
-SCOREBOARD_SPRITE = pygame.transform.scale(
-    pygame.image.load("new_sprites\\spr_chefs_hudscreen.png"), (250, 120)
-)
-
-
-# Constants
-GROUND_Y = (HEIGHT//20)*11
-PLAYER_START_X = WIDTH // 2
-MAX_FOOD_STACK = 5
-STUN_DURATION = 1
-FIREBALL_SPAWN_INTERVAL = 5000
-CUSTOMER_SPAWN_INTERVAL = 1600 
-MISSED_FOOD_FIREBALL_DURATION = 1500
+# importing this file does nothing but the imports (none of them heavy, PIL only gets imported by the code that
+# decodes images), bootstrap() is what opens the window and starts everything loading.
+# python benchmark.py --imports shows where the import time goes
+
+FPS = 60  # only caps the drawing, the simulation always runs at simulation.TICK_RATE
+MENU_FPS = 60  # cap for the menus, they only redraw when something changes anyway (None = no cap)
+
+# GAME_PIXEL_COLLISION=1 decides hits by the sprites' actual pixels instead of the hitbox rectangles (off by default)
+PIXEL_COLLISION = os.environ.get("GAME_PIXEL_COLLISION", "0") == "1"
+
+# every finished round's keys and seed go into replays/ (GAME_RECORD=0 turns it off), see replay.py
+RECORD_REPLAYS = os.environ.get("GAME_RECORD", "1") != "0"
+
+LEADERBOARD_ROWS = 5  # how many scores the leaderboard screen shows
+
+# F3 in game toggles the timing overlay, F4 saves the recorded timings (GAME_PROFILE=1 starts with it on)
+PROFILER = FrameProfiler(enabled=bool(os.environ.get("GAME_PROFILE")))
+
+# filled in by bootstrap()
+WIDTH, HEIGHT = 0, 0
+WIN = None
+FONT = HUD_FONT = MENU_FONT = BOLD_FONT = None
+ASSET_BUNDLE = None
+FOOD_IMAGES = None
+ASSETS = None
+ANIMATIONS = None
+AUDIO = None
+FOOD_POOL = None
+LEADERBOARD = None
+SCORES = None
+
+# these get filled in by use_menu_assets / use_game_assets once the loader has them
+BACKGROUND_IMG = None
+PLAYER_SPRITES = {}
+CUSTOMER_SPRITES = []
+FIREBALL_SPRITE = None
+FOOD_WARNING_SPRITE = None
+SCOREBOARD_SPRITE = None
+HUD = None
+PIXEL_MASKS = None
+
+
+# opens the window and starts every background job (asset decoding, food pool, score saver), only once
+def bootstrap():
+    global WIDTH, HEIGHT, WIN, FONT, HUD_FONT, MENU_FONT, BOLD_FONT
+    global ASSET_BUNDLE, FOOD_IMAGES, ASSETS, ANIMATIONS, AUDIO, FOOD_POOL, LEADERBOARD, SCORES
+    if WIN is not None:
+        return
+
+    pygame.init()
+    try:
+        pygame.mixer.init()  # enables sound
+    except pygame.error as e:  # no audio device, the game still runs (AudioEngine stays quiet)
+        print(f"No sound: {e}")
+
+    screen_info = pygame.display.Info() # player's screen size
+    WIDTH, HEIGHT = screen_info.current_w, screen_info.current_h
+    # GAME_RESOLUTION=1280x720 overrides it (for testing other screen sizes, the benchmarks use it too)
+    if os.environ.get("GAME_RESOLUTION"):
+        WIDTH, HEIGHT = (int(value) for value in os.environ["GAME_RESOLUTION"].lower().split("x"))
+    WIN = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Summer Project")
+
+    FONT = FONTS.get("arial", 24)
+    HUD_FONT = FONTS.get("arial", 48)
+    MENU_FONT = FONTS.get("arial", 64)
+    BOLD_FONT = FONTS.get("arial", 24, bold=True)
+
+    # Load images (from the prebuilt assets.bundle when there is one, see asset_pipeline.py)
+    # everything decodes on background threads, each screen waits only for the sprites it actually draws
+    ASSET_BUNDLE = AssetBundle.open_if_present()
+    FOOD_IMAGES = ImageCache(max_entries=len(IMAGE_PATHS) * len(FOOD_SIZES))
+    ASSETS = AssetLoader()
+    # gifs are decoded once, the first time a screen shows them (GAME_GIF_PALETTE=1 keeps them as 8 bit frames, less memory)
+    ANIMATIONS = AnimationStore(ASSETS, ASSET_BUNDLE, palette=os.environ.get("GAME_GIF_PALETTE") == "1")
+    ASSETS.load_manifest((WIDTH, HEIGHT), ASSET_BUNDLE, FOOD_IMAGES, ANIMATIONS)
+    # both music tracks decode in the background after the sprites, see audio.py
+    AUDIO = AudioEngine(ASSETS)
+
+    # foods are made ahead of time in the background so spawning one is just a pop
+    FOOD_POOL = FoodPool()
+
+    # every score ever saved (see leaderboard.py), journaled on the spot and written to the database
+    # in the background, so ENTER never waits for it
+    LEADERBOARD = Leaderboard()
+    SCORES = ScoreSaver(LEADERBOARD)
 
 # Helper functions -----------------------------------------------------------
 
+# every screen draws the background, so it's the only thing the menu waits for
+def use_menu_assets():
+    global BACKGROUND_IMG
+    BACKGROUND_IMG = ASSETS.get("background")
+
+# blocks until everything run_game draws has finished loading
+def use_game_assets():
+    global FIREBALL_SPRITE, FOOD_WARNING_SPRITE, SCOREBOARD_SPRITE, HUD, PIXEL_MASKS
+    if not PLAYER_SPRITES:
+        for state in ["idle", "walk_left", "walk_right", "jump", "hit", "stunned", "throw_start", "throw"]:
+            PLAYER_SPRITES[state] = ASSETS.get("player_" + state)
+        CUSTOMER_SPRITES.extend(ASSETS.wait(["customer_0", "customer_1"]))
+    FIREBALL_SPRITE = ASSETS.get("fireball")
+    FOOD_WARNING_SPRITE = ASSETS.get("food_warning")
+    SCOREBOARD_SPRITE = ASSETS.get("scoreboard")
+    ASSETS.get("food_images")
+    if HUD is None:
+        HUD = Hud(BACKGROUND_IMG, SCOREBOARD_SPRITE, HUD_FONT, (WIDTH // 2 - 225, 120))
+    if PIXEL_MASKS is None:
+        # masks are made once here from the same surfaces that get drawn (food masks live in FOOD_IMAGES)
+        PIXEL_MASKS = PixelMasks(
+            player={name: pygame.mask.from_surface(sprite) for name, sprite in PLAYER_SPRITES.items()},
+            customers=[pygame.mask.from_surface(sprite) for sprite in CUSTOMER_SPRITES],
+            fireball=pygame.mask.from_surface(FIREBALL_SPRITE),
+            food=lambda path: FOOD_IMAGES.mask(path, FOOD_SIZE),
+        )
+
+# the falling food's label only changes when a new food spawns, so keep the rendered text around
+@functools.lru_cache(maxsize=128)
+def calorie_label(calories):
+    return FONT.render(f"{calories} calories", True, (0, 0, 0))
+
 # ensures the text is centered on the screen
 def draw_text_centered(win, text, font, color, y):
     rendered = font.render(text, True, color)
     rect = rendered.get_rect(center=(WIDTH // 2, y))
     win.blit(rendered, rect)
-
-# literally just creates a button
-def draw_button(win, text, font, color, hover_color, rect, mouse_pos, mouse_click):
-    is_hovered = rect.collidepoint(mouse_pos)
-    pygame.draw.rect(win, hover_color if is_hovered else color, rect, border_radius=12)
-    label = font.render(text, True, (255, 255, 255))
-    label_rect = label.get_rect(center=rect.center)
-    win.blit(label, label_rect)
-    return is_hovered and mouse_click[0]
  
 
 # Helper Classes -----------------------------------------------------------
 
+# one playing copy of a gif from ANIMATIONS (the frames themselves are shared), timed by the gif's own frame durations
 class GIFAnimation:
-    def __init__(self, gif_path, target_width, target_height):
-        self.frames = []
+    def __init__(self, name):
+        self.name = name
+        self.animation = None
         self.current_frame = 0
-        self.frame_delay = 12
-        self.last_frame_time = 0
-        
-        try:
-            # open the gif and extract frames
-            gif = Image.open(gif_path)
-            frame_count = 0
-            
-            while True:
-                # convert PIL image to pygame surface
-                frame_surface = pygame.image.fromstring(gif.convert('RGBA').tobytes(), gif.size, 'RGBA')
-                
-                # scale the frame to target size
-                scaled_frame = pygame.transform.scale(frame_surface, (target_width, target_height))
-                self.frames.append(scaled_frame)
-                
-                frame_count += 1
-                gif.seek(frame_count)
-        except EOFError:
-            pass  # end of gif
-        except Exception as e:
-            print(f"Error loading GIF {gif_path}: {e}")
-            # create a fallback surface
-            fallback = pygame.Surface((target_width, target_height), pygame.SRCALPHA)
-            fallback.fill((255, 0, 255))
-            self.frames.append(fallback)
+        self.start_time = pygame.time.get_ticks()
+        ANIMATIONS.request(name)
+        self.take_loaded_frames()
+
+    # the gif decodes in the background, until it's done there's just nothing to draw
+    def take_loaded_frames(self):
+        if self.animation is None and ANIMATIONS.ready(self.name):
+            self.animation = ANIMATIONS.get(self.name)
     
     def update(self):
-        now = pygame.time.get_ticks()
-        if now - self.last_frame_time > self.frame_delay and len(self.frames) > 1:
-            self.current_frame = (self.current_frame + 1) % len(self.frames)
-            self.last_frame_time = now
+        self.take_loaded_frames()
+        if self.animation is not None:
+            self.current_frame = self.animation.frame_at(pygame.time.get_ticks() - self.start_time)
     
-    def get_current_frame(self):
-        if self.frames:
-            return self.frames[self.current_frame]
+    # when the next frame is due (for FrameScheduler), None for a still image
+    # while the gif is still decoding it checks back every 100 ms
+    def next_frame_time(self):
+        if self.animation is None:
+            return pygame.time.get_ticks() + 100
+        if len(self.animation.frames) > 1:
+            return self.start_time + self.animation.next_change(pygame.time.get_ticks() - self.start_time)
         return None
 
-class Player:
-    def __init__(self):
-        self.x = PLAYER_START_X
-        self.y = GROUND_Y
-        self.vel_y = 0
-        self.gravity = 0.8
-        self.jump_strength = -15
-        self.on_ground = True
-        self.base_speed = 8
-        self.speed = self.base_speed
-        self.direction = "idle"
-        self.state = "normal"
-        self.throw_anim_time = 0
-        self.threw_this_cycle = False
-        self.stun_time = 0
-        self.food_stack = []
-
-    def update_speed(self):
-        penalty = min(len(self.food_stack) * 0.1, 0.5)
-        self.speed = self.base_speed * (1 - penalty)
-
-    def move(self, keys):
-        if self.state in ["hit", "stunned", "throw_start", "throwing"]:
-            return
-        moving = False
-        if keys[pygame.K_LEFT] and self.x > WIDTH//4:
-            self.x -= self.speed
-            self.direction = "left"
-            moving = True
-        if keys[pygame.K_RIGHT] and self.x < (WIDTH//4)*3 - PLAYER_WIDTH:
-            self.x += self.speed
-            self.direction = "right"
-            moving = True
-        if not moving:
-            self.direction = "idle"
-        if keys[pygame.K_x] and self.on_ground:
-            self.vel_y = self.jump_strength
-            self.on_ground = False
-
-    def apply_gravity(self):
-        self.vel_y += self.gravity
-        self.y += self.vel_y
-        if self.y >= GROUND_Y:
-            self.y = GROUND_Y
-            self.vel_y = 0
-            self.on_ground = True
-
-    def start_throw(self):
-        if self.state == "normal" and len(self.food_stack) > 0:
-            self.state = "throw_start"
-            self.throw_anim_time = pygame.time.get_ticks()
-
-    def update_throw(self):
-        now = pygame.time.get_ticks()
-        if self.state == "throw_start" and now - self.throw_anim_time > 150:
-            self.state = "throwing"
-        elif self.state == "throwing" and now - self.throw_anim_time > 300:
-            self.state = "normal"
-            self.threw_this_cycle = False
-
-    # switches between sprites based on the player's state
-    def get_current_sprite(self):
-        if self.state == "hit":
-            return PLAYER_SPRITES["hit"]
-        elif self.state == "stunned":
-            return PLAYER_SPRITES["stunned"]
-        elif self.state == "throw_start":
-            return PLAYER_SPRITES["throw_start"]
-        elif self.state == "throwing":
-            return PLAYER_SPRITES["throw"]
-        elif not self.on_ground:
-            return PLAYER_SPRITES["jump"]
-        else:
-            if self.direction == "left":
-                return PLAYER_SPRITES["walk_left"]
-            elif self.direction == "right":
-                return PLAYER_SPRITES["walk_right"]
-            else:
-                return PLAYER_SPRITES["idle"]
-
-    def stun(self):
-        self.state = "stunned"
-        self.stun_time = pygame.time.get_ticks()
-        self.food_stack.clear()
-        self.update_speed()
-
-    def update_stun(self):
-        if self.state == "stunned":
-            if pygame.time.get_ticks() - self.stun_time > STUN_DURATION * 1000:
-                self.state = "normal"
-
-
-class Customer:
-    def __init__(self):
-        self.y = GROUND_Y + (HEIGHT//20)*4  
-        self.x = WIDTH + 50  
-        self.speed = 3
-        self.sprite_index = 0
-        self.last_sprite_switch = pygame.time.get_ticks()
-        self.width = 100
-        self.height = 120
-        self.hitbox = pygame.Rect(self.x, self.y, self.width, self.height)
-        self.alive = True
-
-    # moves the customer to the left and switches between sprites
-    def update(self):
-        self.x -= self.speed
-        now = pygame.time.get_ticks()
-        if now - self.last_sprite_switch > 300:
-            self.sprite_index = 1 - self.sprite_index
-            self.last_sprite_switch = now
-        self.hitbox.topleft = (self.x, self.y)
-        if self.x < -self.width:
-            self.alive = False
-
-    def draw(self, win):
-        sprite = CUSTOMER_SPRITES[self.sprite_index]
-        win.blit(sprite, (self.x, self.y))
-
-# fireball class (only for the ones that are created when food hits the ground) because something didn't work when there was just one class
-class Fireball:
-    def __init__(self, x, y, direction, is_obstacle=True):
-        self.x = x
-        self.y = y
-        self.speed = 4
-        self.direction = direction  # either "left" or "right"
-        self.width = 40
-        self.height = 40
-        self.hitbox = pygame.Rect(self.x + 10, self.y + 10, 20, 20)
-        self.alive = True
-        self.spawn_time = pygame.time.get_ticks()
-        self.is_obstacle = is_obstacle
-        self.visible = True
-
-    def update(self):
-        if self.is_obstacle:
-            # Moving obstacle fireballs
-            if self.direction == "left":
-                self.x -= self.speed
-            else:
-                self.x += self.speed
-            self.hitbox.topleft = (self.x, self.y)
-
-            # Remove if off screen
-            if self.x < -self.width or self.x > WIDTH + self.width:
-                self.alive = False
-        else:
-            # Static penalty fireballs
-            self.hitbox.topleft = (self.x, self.y)
-            current_time = pygame.time.get_ticks()
-            time_alive = current_time - self.spawn_time
-            
-            if time_alive > 2000:  # 2 seconds total
-                self.alive = False
-            elif time_alive > 1200:  # Start blinking at 1.2 seconds
-                # Blink every 100ms (10 times per second)
-                self.visible = (time_alive // 100) % 2 == 0
-
-    def draw(self, win):
-        if self.visible:
-            win.blit(FIREBALL_SPRITE, (self.x, self.y))
-
-# obstacle fireball class (only for the ones that are moving from side to side)
-class ObstacleFireball:
-    def __init__(self, x, y, direction):
-        self.x = x
-        self.y = y
-        self.speed = 3
-        self.direction = direction  # either "left" or "right"
-        self.width = 40
-        self.height = 40
-        self.hitbox = pygame.Rect(self.x + 10, self.y + 10, 20, 20)
-        self.alive = True
-
-    def update(self):
-        if self.direction == "left":
-            self.x -= self.speed
-        else:
-            self.x += self.speed
-        self.hitbox.topleft = (self.x + 10, self.y + 10)
-
-        if self.x < -self.width or self.x > WIDTH + self.width:
-            self.alive = False
-
-    def draw(self, win):
-        win.blit(FIREBALL_SPRITE, (self.x, self.y))
-
-# thrown food logic 
-class ThrownFood:
-    def __init__(self, food, x, y):
-        self.food = food
-        self.x = x
-        self.y = y
-        self.speed = 10
-        self.width = 50
-        self.height = 50
-        self.hitbox = pygame.Rect(self.x, self.y, self.width, self.height)
-        self.alive = True
-
-    def update(self):
-        self.y += self.speed
-        self.hitbox.topleft = (self.x, self.y)
-        if self.y > HEIGHT + self.height:
-            self.alive = False
-
-    def draw(self, win):
-        img = pygame.image.load(self.food.path)
-        win.blit(pygame.transform.scale(img, (self.width, self.height)), (self.x, self.y))
-
+    def get_current_frame(self):
+        if self.animation is not None:
+            return self.animation.frames[self.current_frame]
+        return None
 
 # All game parts (menu, game, controls, about, leaderboard) ---------------------------------------------
 # instructions screen 
+# layouts only depend on the screen size, so each one is built once and reused every time the screen opens
+@functools.lru_cache(maxsize=None)
+def instructions_layout(width, height):
+    white, grey = (255, 255, 255), (200, 200, 200)
+    return [
+        Label("Instructions", MENU_FONT, white, center=(width // 2, 100)),
+        Label("Move using arrow keys: ← → ", FONT, white, center=(width // 2, 200)),
+        Label("Press X to jump", FONT, white, center=(width // 2, 250)),
+        Label("Press Z to throw stacked healthy food", FONT, white, center=(width // 2, 300)),
+        Label("Avoid fireballs and unhealthy food", FONT, white, center=(width // 2, 370)),
+        Label("ESC to return", FONT, grey, center=(width // 2, 450)),
+    ]
+
 def show_instructions():
     # Load dance gifs (left and right)
-    cabbage_gif_left = GIFAnimation("new_sprites\\spr_tenna_dance_cabbage.gif", 300, 300)
-    cabbage_gif_right = GIFAnimation("new_sprites\\spr_tenna_dance_cabbage.gif", 300, 300)
+    cabbage_gif_left = GIFAnimation("cabbage")
+    cabbage_gif_right = GIFAnimation("cabbage")
+    labels = instructions_layout(WIDTH, HEIGHT)
     
+    scheduler = FrameScheduler(MENU_FPS)
     running = True
     while running:
-        WIN.blit(BACKGROUND_IMG, (0, 0))
+        if scheduler.frame_due():
+            WIN.blit(BACKGROUND_IMG, (0, 0))
         
-        # display gifs
-        cabbage_gif_left.update()
-        cabbage_gif_right.update()
-        cabbage_frame_left = cabbage_gif_left.get_current_frame()
-        cabbage_frame_right = cabbage_gif_right.get_current_frame()
-        if cabbage_frame_left:
-            WIN.blit(cabbage_frame_left, (100, HEIGHT//2 - 150))
-        if cabbage_frame_right:
-            WIN.blit(cabbage_frame_right, (WIDTH - 400, HEIGHT//2 - 150))
+            # display gifs
+            cabbage_gif_left.update()
+            cabbage_gif_right.update()
+            cabbage_frame_left = cabbage_gif_left.get_current_frame()
+            cabbage_frame_right = cabbage_gif_right.get_current_frame()
+            if cabbage_frame_left:
+                WIN.blit(cabbage_frame_left, (100, HEIGHT//2 - 150))
+            if cabbage_frame_right:
+                WIN.blit(cabbage_frame_right, (WIDTH - 400, HEIGHT//2 - 150))
         
-        draw_text_centered(WIN, "Instructions", MENU_FONT, (255, 255, 255), 100)
-        draw_text_centered(WIN, "Move using arrow keys: ← → ", FONT, (255, 255, 255), 200)
-        draw_text_centered(WIN, "Press X to jump", FONT, (255, 255, 255), 250)
-        draw_text_centered(WIN, "Press Z to throw stacked healthy food", FONT, (255, 255, 255), 300)
-        draw_text_centered(WIN, "Avoid fireballs and unhealthy food", FONT, (255, 255, 255), 370)
-        draw_text_centered(WIN, "ESC to return", FONT, (200, 200, 200), 450)
-        pygame.display.update()
-        for event in pygame.event.get():
+            for label in labels:
+                label.draw(WIN)
+            pygame.display.update()
+            scheduler.drew()
+            scheduler.schedule(cabbage_gif_left.next_frame_time())
+            scheduler.schedule(cabbage_gif_right.next_frame_time())
+        for event in scheduler.wait():
             if event.type == pygame.QUIT:
                 pygame.quit()
                 exit()
             elif event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
                 running = False
+
 # about screen 
-def show_about():
+@functools.lru_cache(maxsize=None)
+def about_plot():
     try: 
         plot_img = pygame.image.load("data_plot_high_res.png")
-        plot_img = pygame.transform.scale(plot_img, (800, 600))
+        return pygame.transform.scale(plot_img, (800, 600)).convert()
     except pygame.error as e: # debug print
         print(f"Could not load data plot: {e}")
-        plot_img = None
+        return None
+
+@functools.lru_cache(maxsize=None)
+def about_layout(width, height):
+    black = (0, 0, 0)
+    left_text_x = width * 0.25  
+    first_line_x = width * 0.45  # first line is further to the right to align with the image better
+    last_lines_x = width * 0.225 # last lines closer to the left side
+    first_line_text = "The game has different kinds of food with random calories assigned. Using a dataset of foods, we found a linear relation:"
+
+    labels = [
+        Label("About", MENU_FONT, (255, 255, 255), center=(width // 2, 80)),
+        Label(first_line_text, FONT, black, midtop=(first_line_x, 150)),
+        Label("Linear relation equation:", FONT, black, midtop=(left_text_x, 210)),
+        Label("Total Fat (g) = 0.0448 × Energy (kCal) - 2.1217", FONT, black, midtop=(left_text_x, 240)),
+        Label("Healthy food is defined as food with less than 20g of fat.", FONT, black, midtop=(left_text_x, 300)),
+    ]
+    # last 2 lines are bolded and closer to the left side, split around "and" to align better with the background image
+    labels += [
+        Label("Your goal is to catch healthy food,", BOLD_FONT, black, midtop=(last_lines_x - 160, 570)),
+        Label("then throw it at the customers", BOLD_FONT, black, midtop=(last_lines_x + 190, 570)),
+        Label("Avoid unhealthy food and fireballs!", BOLD_FONT, black, midtop=(last_lines_x, 605)),
+        Label("ESC to return", FONT, (200, 200, 200), center=(width // 2, 850)),
+    ]
+    return labels
+
+def show_about():
+    plot_img = about_plot()
+    labels = about_layout(WIDTH, HEIGHT)
     
+    scheduler = FrameScheduler(MENU_FPS)
     running = True
     while running:
-        WIN.blit(BACKGROUND_IMG, (0, 0))
-        
-        draw_text_centered(WIN, "About", MENU_FONT, (255, 255, 255), 80)
-        
-        if plot_img:
-            plot_rect = plot_img.get_rect(center=(WIDTH * 0.7, HEIGHT * 0.55))
-            WIN.blit(plot_img, plot_rect)
+        if scheduler.frame_due():
+            WIN.blit(BACKGROUND_IMG, (0, 0))
         
-        left_text_x = WIDTH * 0.25  
+            if plot_img:
+                plot_rect = plot_img.get_rect(center=(WIDTH * 0.7, HEIGHT * 0.55))
+                WIN.blit(plot_img, plot_rect)
         
-        # helper function to draw text on the left side
-        def draw_left_text(text, font, color, y):
-            rendered = font.render(text, True, color)
-            WIN.blit(rendered, (left_text_x - rendered.get_width()//2, y))
-        
-        # Text content on the left
-        first_line_x = WIDTH * 0.45  # first line is further to the right to align with the image better
-        last_lines_x = WIDTH * 0.225 # last lines closer to the left side
-        first_line_text = "The game has different kinds of food with random calories assigned. Using a dataset of foods, we found a linear relation:"
-        first_line_rendered = FONT.render(first_line_text, True, (0, 0, 0))
-        WIN.blit(first_line_rendered, (first_line_x - first_line_rendered.get_width()//2, 150))
-        draw_left_text("", FONT, (0, 0, 0), 180)
-        draw_left_text("Linear relation equation:", FONT, (0, 0, 0), 210)
-        draw_left_text("Total Fat (g) = 0.0448 × Energy (kCal) - 2.1217", FONT, (0, 0, 0), 240)
-        draw_left_text("", FONT, (0, 0, 0), 270)  
-        draw_left_text("Healthy food is defined as food with less than 20g of fat.", FONT, (0, 0, 0), 300)    
-        # last 2 lines are bolded and closer to the left side, split around "and" to align better with the background image
-        last_line1_part1 = "Your goal is to catch healthy food,"
-        last_line1_part2 = "then throw it at the customers"
-        last_line2_text = "Avoid unhealthy food and fireballs!"   
-             
-        part1_1 = pygame.font.SysFont("arial", 24, bold=True).render(last_line1_part1, True, (0, 0, 0))
-        part1_2 = pygame.font.SysFont("arial", 24, bold=True).render(last_line1_part2, True, (0, 0, 0))
-        last_line2_rendered = pygame.font.SysFont("arial", 24, bold=True).render(last_line2_text, True, (0, 0, 0))
-
-        WIN.blit(part1_1, (last_lines_x - part1_1.get_width()//2 - 160, 570))  
-        WIN.blit(part1_2, (last_lines_x - part1_2.get_width()//2 + 190, 570)) 
-        WIN.blit(last_line2_rendered, (last_lines_x - last_line2_rendered.get_width()//2, 605))  
-        
-        draw_text_centered(WIN, "ESC to return", FONT, (200, 200, 200), 850)
-        pygame.display.update()
-        for event in pygame.event.get():
+            for label in labels:
+                label.draw(WIN)
+            pygame.display.update()
+            scheduler.drew()
+        for event in scheduler.wait():
             if event.type == pygame.QUIT:
                 pygame.quit()
                 exit()
@@ -461,37 +294,45 @@ def show_about():
                 running = False
 
 # game end screen where the player enters their name to save their score to the leaderboard
+@functools.lru_cache(maxsize=None)
+def game_over_layout(width, height):
+    white = (255, 255, 255)
+    labels = [
+        Label("GAME OVER", MENU_FONT, white, center=(width // 2, 200)),
+        Label("Enter your name:", FONT, white, center=(width // 2, 400)),
+        Label("Press ENTER to save score", FONT, (200, 200, 200), center=(width // 2, 500)),
+    ]
+    return translucent_panel((width, height)), labels
+
 def show_game_over_screen(final_score):
     player_name = ""
-    input_active = True
+    overlay, labels = game_over_layout(WIDTH, HEIGHT)
+    score_label = Label(f"Your Score: {final_score}", HUD_FONT, (255, 255, 255), center=(WIDTH // 2, 300)) # final score
+    input_rect = pygame.Rect(WIDTH//2 - 150, 430, 300, 40) # input box
+    name_label = Label(player_name, FONT, (255, 255, 255), topleft=(input_rect.x + 10, input_rect.y + 10))
     
+    scheduler = FrameScheduler(MENU_FPS)
     running = True
     while running:
-        WIN.blit(BACKGROUND_IMG, (0, 0))
-        
-        overlay = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-        pygame.draw.rect(overlay, (0, 0, 0, 128), (0, 0, WIDTH, HEIGHT))
-        WIN.blit(overlay, (0, 0))
-        
-        draw_text_centered(WIN, "GAME OVER", MENU_FONT, (255, 255, 255), 200)
+        if scheduler.frame_due():
+            WIN.blit(BACKGROUND_IMG, (0, 0))
+            WIN.blit(overlay, (0, 0))
         
-        draw_text_centered(WIN, f"Your Score: {final_score}", HUD_FONT, (255, 255, 255), 300) # final score
+            for label in labels:
+                label.draw(WIN)
+            score_label.draw(WIN)
         
-        draw_text_centered(WIN, "Enter your name:", FONT, (255, 255, 255), 400)
+            pygame.draw.rect(WIN, (255, 255, 255), input_rect, 2)
+            pygame.draw.rect(WIN, (50, 50, 50), input_rect)
         
-        input_rect = pygame.Rect(WIDTH//2 - 150, 430, 300, 40) # input box
-        pygame.draw.rect(WIN, (255, 255, 255), input_rect, 2)
-        pygame.draw.rect(WIN, (50, 50, 50), input_rect)
+            # player input text (only rendered again when the name changes)
+            name_label.set(player_name)
+            name_label.draw(WIN)
         
-        # player input text
-        name_surface = FONT.render(player_name, True, (255, 255, 255))
-        WIN.blit(name_surface, (input_rect.x + 10, input_rect.y + 10))
-        
-        draw_text_centered(WIN, "Press ENTER to save score", FONT, (200, 200, 200), 500)
-        
-        pygame.display.update()
+            pygame.display.update()
+            scheduler.drew()
         
-        for event in pygame.event.get():
+        for event in scheduler.wait():
             if event.type == pygame.QUIT:
                 pygame.quit()
                 exit()
@@ -499,450 +340,318 @@ def show_game_over_screen(final_score):
                 if event.key == pygame.K_RETURN and player_name.strip():
                     save_score_to_leaderboard(player_name.strip(), final_score)
                     running = False
-                    try:
-                        pygame.mixer.music.load("silly_menu.mp3")
-                        pygame.mixer.music.play(-1)
-                    except pygame.error as e:
-                        print(f"Could not load menu music: {e}")
+                    AUDIO.play_music("menu")
                     return  # Return to main menu instead of quitting
-                elif event.key == pygame.K_BACKSPACE:
+                elif event.key == pygame.K_BACKSPACE and player_name:
                     player_name = player_name[:-1]
-                elif event.unicode.isprintable() and len(player_name) < 20:
+                    scheduler.request_redraw()
+                elif event.unicode.isprintable() and event.unicode and len(player_name) < 20:
                     player_name += event.unicode
+                    scheduler.request_redraw()
 
-# saves the player's name and score to the leaderboard
+# saves the player's name and score to the leaderboard (the database write itself happens in the background)
 def save_score_to_leaderboard(name, score):
     try:
-        scores = []
-        try:
-            with open("leaderboard.csv", newline='', mode='r') as file:
-                reader = csv.reader(file)
-                # skip header row 
-                header = next(reader, None)
-                if header and header[0] == "Name":   
-                    scores = list(reader)
-                else: # for debug purposes, in case the file doesn't have a header
-                    if header:
-                        scores = [header]
-                    scores.extend(list(reader))
-        except FileNotFoundError:
-            pass
-        
-        # add new score
-        scores.append([name, str(score)])
-        
-        # Sort by score (descending) and keep top 5
-        scores.sort(key=lambda row: int(row[1]), reverse=True) # Assaf learned what a lambda function is!!!
-        scores = scores[:5]
-        
-        with open("leaderboard.csv", newline='', mode='w') as file:
-            writer = csv.writer(file)
-            writer.writerow(["Name", "Score"]) 
-            writer.writerows(scores)
-            
-    except Exception as e:
+        SCORES.save(name, score)
+    except OSError as e:
         print(f"Error saving score: {e}")
 
 # leaderboard screen
 def show_leaderboard():
-    scores = []
+    # only the rows that get shown are read, however many scores are saved
+    # (a score saved a moment ago is in there even if the background write hasn't finished)
     try:
-        with open("leaderboard.csv", newline='') as file:
-            reader = csv.reader(file)
-            header = next(reader, None)
-            if header and header[0] == "Name":
-                scores = list(reader)
-            else:
-                if header:
-                    scores = [header]
-                scores.extend(list(reader))
-    except FileNotFoundError:
-        pass
+        scores = SCORES.top(LEADERBOARD_ROWS)
+    except sqlite3.Error as e:
+        print(f"Error reading leaderboard: {e}")
+        scores = []
 
     # load other dance gifs
-    cane_gif_left = GIFAnimation("new_sprites\\spr_tenna_dance_cane.gif", 300, 300)
-    cane_gif_right = GIFAnimation("new_sprites\\spr_tenna_dance_cane.gif", 300, 300)
-
+    cane_gif_left = GIFAnimation("cane")
+    cane_gif_right = GIFAnimation("cane")
+
+    # the scores don't change while the screen is open, so the text is rendered once on the way in
+    white = (255, 255, 255)
+    labels = [Label("Leaderboard", MENU_FONT, white, center=(WIDTH // 2, 80))]
+    if scores:
+        for i, (name, score) in enumerate(scores):
+            labels.append(Label(f"{i+1}. {name}: {score}", FONT, white, center=(WIDTH // 2, 160 + i*50)))
+    else:
+        labels.append(Label("No scores yet!", FONT, white, center=(WIDTH // 2, 200)))
+    labels.append(Label("ESC to return", FONT, (200, 200, 200), center=(WIDTH // 2, 500)))
+
+    scheduler = FrameScheduler(MENU_FPS)
     running = True
     while running:
-        WIN.blit(BACKGROUND_IMG, (0, 0))
-        
-        # update gifs
-        cane_gif_left.update()
-        cane_gif_right.update()
-        cane_frame_left = cane_gif_left.get_current_frame()
-        cane_frame_right = cane_gif_right.get_current_frame()
-        if cane_frame_left:
-            WIN.blit(cane_frame_left, (100, HEIGHT//2 - 150))
-        if cane_frame_right:
-            WIN.blit(cane_frame_right, (WIDTH - 400, HEIGHT//2 - 150))
-        draw_text_centered(WIN, "Leaderboard", MENU_FONT, (255, 255, 255), 80)
+        if scheduler.frame_due():
+            WIN.blit(BACKGROUND_IMG, (0, 0))
         
-        if scores:
-            for i, (name, score) in enumerate(scores):
-                draw_text_centered(WIN, f"{i+1}. {name}: {score}", FONT, (255, 255, 255), 160 + i*50)
-        else:
-            draw_text_centered(WIN, "No scores yet!", FONT, (255, 255, 255), 200)
-            
-        draw_text_centered(WIN, "ESC to return", FONT, (200, 200, 200), 500)
-        pygame.display.update()
-
-        for event in pygame.event.get():
+            # update gifs
+            cane_gif_left.update()
+            cane_gif_right.update()
+            cane_frame_left = cane_gif_left.get_current_frame()
+            cane_frame_right = cane_gif_right.get_current_frame()
+            if cane_frame_left:
+                WIN.blit(cane_frame_left, (100, HEIGHT//2 - 150))
+            if cane_frame_right:
+                WIN.blit(cane_frame_right, (WIDTH - 400, HEIGHT//2 - 150))
+            for label in labels:
+                label.draw(WIN)
+            pygame.display.update()
+            scheduler.drew()
+            scheduler.schedule(cane_gif_left.next_frame_time())
+            scheduler.schedule(cane_gif_right.next_frame_time())
+
+        for event in scheduler.wait():
             if event.type == pygame.QUIT:
                 pygame.quit()
                 exit()
             elif event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
                 running = False
 
+# draws the current state of a round (the simulation does all the updating)
+# everything goes through the DirtyRenderer so only the parts of the screen that changed get redrawn
+# moving things are drawn alpha of the way from the previous simulation step to the current one
+def draw_game(renderer, sim, profiler=NULL_PROFILER, alpha=1.0):
+    player = sim.player
+    player_x, player_y = sim.player_position(alpha)
+    renderer.begin_frame()
+    profiler.mark("draw_background")
+
+    HUD.update(sim.score, sim.time_left)
+    HUD.draw(renderer)
+    profiler.mark("draw_hud")
+
+    # display food warning if visible is set to true
+    if sim.food_warning_visible:
+        renderer.blit(FOOD_WARNING_SPRITE, (sim.food_warning_x, 50))
+
+    # display obstacle warning if visible is set to true
+    if sim.obstacle_warning_visible:
+        if sim.obstacle_warning_side == "left":
+            renderer.blit(FOOD_WARNING_SPRITE, (20, sim.ground_y + 20))
+        else:
+            renderer.blit(FOOD_WARNING_SPRITE, (WIDTH - 100, sim.ground_y + 20))
+
+    if sim.current_food:
+        food_x, food_y = sim.food_position(alpha)
+        renderer.blit(FOOD_IMAGES.get(sim.current_food.path, FOOD_SIZE), (food_x, food_y))
+        renderer.blit(calorie_label(int(sim.current_food.calories)), (food_x + 5, food_y - 25))
+    profiler.mark("draw_food")
+
+    # entities are numpy rows (see entities.py), each kind goes out in a single blits call
+    customer_x, customer_y = sim.customers.positions(alpha)
+    renderer.blits([(CUSTOMER_SPRITES[frame], (x, y)) for x, y, frame in
+                    zip(customer_x.tolist(), customer_y.tolist(), sim.customer_frames().tolist())])
+
+    fireballs = sim.fireballs
+    renderer.blits([(FIREBALL_SPRITE, (x, y)) for x, y, visible in
+                    zip(fireballs.x.tolist(), fireballs.y.tolist(), sim.fireballs_visible().tolist()) if visible])
+
+    obstacle_x, obstacle_y = sim.obstacle_fireballs.positions(alpha)
+    renderer.blits([(FIREBALL_SPRITE, position) for position in zip(obstacle_x.tolist(), obstacle_y.tolist())])
+
+    thrown_x, thrown_y = sim.thrown_foods.positions(alpha)
+    renderer.blits([(FOOD_IMAGES.get(food.path, FOOD_SIZE), position) for food, position in
+                    zip(sim.thrown_foods.payload, zip(thrown_x.tolist(), thrown_y.tolist()))])
+    profiler.mark("draw_entities")
+
+    for i, food in enumerate(player.food_stack):
+        renderer.blit(FOOD_IMAGES.get(food.path, STACK_FOOD_SIZE), (player_x + PLAYER_WIDTH//2 - 20, player_y - (i + 1)*45))
+
+    # display player
+    renderer.blit(PLAYER_SPRITES[player.get_sprite_name()], (player_x, player_y))
+    profiler.mark("draw_player")
+
+# the F3 overlay: timings plus entity counts and how well the food image cache is doing
+def draw_perf_overlay(renderer, sim):
+    extra_lines = [
+        f"customers {len(sim.customers)}  fireballs {len(sim.fireballs)}  obstacles {len(sim.obstacle_fireballs)}",
+        f"thrown {len(sim.thrown_foods)}  stack {len(sim.player.food_stack)}",
+        f"food images {FOOD_IMAGES.hit_rate() * 100:.1f}% hits ({FOOD_IMAGES.hits} / {FOOD_IMAGES.misses} misses)",
+    ]
+    if renderer.last_update_was_full:
+        extra_lines.append("last update: full screen")
+    else:
+        extra_lines.append(f"last update: {len(renderer.previous_rects)} dirty rects")
+    renderer.add_dirty(draw_overlay(renderer.win, PROFILER, FONT, extra_lines))
+
 # actual main game loop
-def run_game():
+# with a replay.Replay it plays that recording back instead of reading the keyboard (and skips the game over screen),
+# the arrow keys jump 5 seconds back / forward through it
+def run_game(replay=None):
+    if not ASSETS.all_done():
+        WIN.blit(BACKGROUND_IMG, (0, 0))
+        draw_text_centered(WIN, "Loading...", MENU_FONT, (255, 255, 255), HEIGHT // 2)
+        pygame.display.update()
+    use_game_assets()
+
     clock = pygame.time.Clock()
-    try:
-        pygame.mixer.music.load("game_active.mp3")
-        pygame.mixer.music.play(-1) 
-    except pygame.error as e: # debug print
-        print(f"Could not load music: {e}")
-
-    player = Player()
-    score = 0
-    timer = 90 
-    start_time = pygame.time.get_ticks()
-
-    current_food = None
-    food_img = None
-    food_x = 0
-    food_y = 0
-    food_speed = 4
-    food_spawn_time = 0
-    food_warning_visible = False
-    food_warning_x = 0  # track warning x position (used to spawn food later)
-    obstacle_warning_visible = False
-    obstacle_warning_side = "left" 
-    obstacle_warning_time = 0
-
-    customers = []
-    fireballs = []
-    obstacle_fireballs = []
-    thrown_foods = []
-
-    last_customer_spawn = 0
-    last_fireball_spawn = 0
+    AUDIO.play_music("game")
+
+    # the seed decides everything random in the round (food included), so seed + keys is enough to replay it
+    seed = replay.seed if replay is not None else random.randrange(2**32)
+    FOOD_POOL.reseed(seed)
+    sim = GameSimulation(WIDTH, HEIGHT, seed=seed, food_pool=FOOD_POOL)
+    sim.profiler = PROFILER
+    if (replay.pixel_collision if replay is not None else PIXEL_COLLISION):
+        sim.masks = PIXEL_MASKS
+    recorder = Recorder(seed, WIDTH, HEIGHT, sim.masks is not None) if replay is None and RECORD_REPLAYS else None
+    replay_inputs = replay.inputs() if replay is not None else None
+    snapshots = SnapshotBuffer() if replay is not None else None
+    if snapshots is not None:
+        snapshots.record(sim)
+    renderer = DirtyRenderer(WIN, BACKGROUND_IMG)
+    timestep = FixedTimestep()
+    clock.tick(FPS)  # so the first step doesn't count the time spent loading
 
     running = True
 
     while running:
-        clock.tick(FPS)
-        now = pygame.time.get_ticks()
-
-        WIN.blit(BACKGROUND_IMG, (0, 0))
-
-        hud_x = WIDTH // 2 - 225  
-        hud_y = 120  
-        scaled_hud = pygame.transform.scale(SCOREBOARD_SPRITE, (450, 220))
-        WIN.blit(scaled_hud, (hud_x, hud_y))
-
-        score_label = HUD_FONT.render("SCORE:", True, (255, 255, 255)) 
-        score_value = HUD_FONT.render(str(score), True, (255, 255, 255)) 
-        
-        label_x = hud_x + (450 - score_label.get_width()) // 2
-        label_y = hud_y + 60 
-        value_x = hud_x + (450 - score_value.get_width()) // 2
-        value_y = hud_y + 120 
-        
-        WIN.blit(score_label, (label_x, label_y))
-        WIN.blit(score_value, (value_x, value_y))
+        frame_time = clock.tick(FPS)
+        PROFILER.begin_frame(frame_time)
 
         # events
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
-
-        keys = pygame.key.get_pressed()
-
-        # update player stun timer
-        player.update_stun()
-
-        # player actions
-        player.move(keys)
-        player.apply_gravity()
-        player.update_speed()
-        player.update_throw()
-
-        # update timer
-        elapsed_time = (now - start_time) // 1000
-        time_left = max(0, timer - elapsed_time)
-        
-        timer_text = HUD_FONT.render(f"TIME: {time_left}", True, (255, 255, 255)) 
-        timer_x = hud_x + 20 
-        timer_y = hud_y + 20 
-        WIN.blit(timer_text, (timer_x, timer_y))
-
-        # throw food if Z pressed
-        if keys[pygame.K_z]:
-            player.start_throw()
-
-        # spawn food logic with warning sprite
-        if current_food is None:
-            if not food_warning_visible:
-                # set warning position first, then show warning
-                food_warning_x = random.randint(WIDTH//4, (WIDTH//4) * 3) 
-                food_warning_visible = True
-                food_spawn_time = now + 1000  # warning visible for 1 sec
-            else:
-                if now >= food_spawn_time:
-                    current_food = Food(path=None, calories=None)
-                    food_x = food_warning_x  # use the same x position as warning
-                    food_y = -50
-                    food_warning_visible = False
-        else:
-            # move food down
-            food_y += food_speed
-
-            # check catch
-            food_rect = pygame.Rect(food_x, food_y, 50, 50)
-            player_rect = pygame.Rect(player.x, player.y, PLAYER_WIDTH, PLAYER_HEIGHT)
-            if food_rect.colliderect(player_rect) and player.state == "normal":
-                # add to stack if healthy
-                if current_food.is_healthy:
-                    if len(player.food_stack) < MAX_FOOD_STACK:
-                        player.food_stack.append(current_food)
-                        player.update_speed()
-                    else:
-                        # stack full, food missed (turn into fireball)
-                        fireballs.append(Fireball(food_x, GROUND_Y + 40, "left", is_obstacle=False))
-                else:   
-                    # bad food hit player -> lose stack + stun
-                    # only lose points if not already stunned
-                    if player.state != "stunned":
-                        score = max(0, score - 25)
-                    player.stun()
-                current_food = None
-
-            # check if food hits the ground
-            if food_y >= GROUND_Y + (HEIGHT//20)*2:
-                # food hit the ground -> turn into fireball
-                fireballs.append(Fireball(food_x, GROUND_Y + (HEIGHT//20)*2, "left", is_obstacle=False))
-                current_food = None
-
-        # display food warning if visible is set to true
-        if food_warning_visible:
-            WIN.blit(FOOD_WARNING_SPRITE, (food_warning_x, 50))
-
-        # display obstacle warning if visible is set to true
-        if obstacle_warning_visible:
-            if obstacle_warning_side == "left":
-                WIN.blit(FOOD_WARNING_SPRITE, (20, GROUND_Y + 20))
-            else:
-                WIN.blit(FOOD_WARNING_SPRITE, (WIDTH - 100, GROUND_Y + 20))
-
-        if current_food:
-            food_img = pygame.image.load(current_food.path)
-            WIN.blit(pygame.transform.scale(food_img, (50, 50)), (food_x, food_y))
-            calorie_text = FONT.render(f"{int(current_food.calories)} calories", True, (0, 0, 0))
-            WIN.blit(calorie_text, (food_x + 5, food_y - 25))
-
-        # spawn customers every CUSTOMER_SPAWN_INTERVAL
-        if now - last_customer_spawn > CUSTOMER_SPAWN_INTERVAL:
-            customers.append(Customer())
-            last_customer_spawn = now
-
-        for c in customers[:]:
-            c.update()
-            c.draw(WIN)
-            if not c.alive:
-                customers.remove(c)
-
-        # spawn obstacle fireballs every FIREBALL_SPAWN_INTERVAL
-        if now - last_fireball_spawn > FIREBALL_SPAWN_INTERVAL:
-            if not obstacle_warning_visible:
-                obstacle_warning_side = random.choice(["left", "right"])
-                obstacle_warning_visible = True
-                obstacle_warning_time = now + 1000  # 1 second warning
-            else:
-                if now >= obstacle_warning_time:
-                    # spawn the obstacle fireball
-                    side = obstacle_warning_side
-                    y_pos = GROUND_Y + (HEIGHT//20)*2
-                    if side == "left":
-                        x_pos = -40  # spawn on the left edge
-                        direction = "right"
-                    else:
-                        x_pos = WIDTH  # spawn on the right edge  
-                        direction = "left"
-                    obstacle_fireballs.append(ObstacleFireball(x_pos, y_pos, direction))
-                    print(f"Spawned obstacle fireball at ({x_pos}, {y_pos}) moving {direction}")  # debug print
-                    obstacle_warning_visible = False
-                    last_fireball_spawn = now
-
-        # update fireballs
-        for f in fireballs[:]:
-            f.update()
-            f.draw(WIN)
-            # check collision with player
-            player_rect = pygame.Rect(player.x, player.y, PLAYER_WIDTH, PLAYER_HEIGHT)
-            if f.hitbox.colliderect(player_rect):
-                # player hit by fireball -> stun, lose stack, and lose points
-                # only lose points if not already stunned
-                if player.state != "stunned":
-                    score = max(0, score - 25)
-                player.stun()
-                fireballs.remove(f)
-            elif not f.alive:
-                fireballs.remove(f)
-
-        # update obstacle fireballs
-        for of in obstacle_fireballs[:]:
-            of.update()
-            of.draw(WIN)
-            # check collision with player
-            player_rect = pygame.Rect(player.x, player.y, PLAYER_WIDTH, PLAYER_HEIGHT)
-            if of.hitbox.colliderect(player_rect):
-                # player hit by obstacle fireball - stun, lose stack, and lose points
-                # only lose points if not already stunned
-                if player.state != "stunned":
-                    score = max(0, score - 25)
-                player.stun()
-                obstacle_fireballs.remove(of)
-            elif not of.alive:
-                obstacle_fireballs.remove(of)
-
-        if player.state == "throwing" and player.food_stack and not player.threw_this_cycle:
-            # throw all the food in the stack
-            stack_size = len(player.food_stack)
-            for i, food_to_throw in enumerate(player.food_stack[:]):
-                # spread the food items horizontally so they don't overlap (also makes hitting customers easier (it's not a bug, it's a feature))
-                x_offset = (i - stack_size//2) * 20 
-                thrown_foods.append(ThrownFood(food_to_throw, player.x + PLAYER_WIDTH//2 - 25 + x_offset, player.y))
-            
-            # clear the stack after throwing
-            player.food_stack.clear()
-            player.threw_this_cycle = True
-            player.update_speed()
-
-        # update thrown food
-        for tf in thrown_foods[:]:
-            tf.update()
-            tf.draw(WIN)
-            tf_rect = pygame.Rect(tf.x, tf.y, tf.width, tf.height)
-            hit_customer = None
-            for c in customers:
-                if c.hitbox.colliderect(tf_rect):
-                    hit_customer = c
+            elif event.type == pygame.KEYDOWN and replay is not None and event.key in (pygame.K_LEFT, pygame.K_RIGHT):
+                jump = -5 if event.key == pygame.K_LEFT else 5
+                replay_inputs = seek(sim, replay, snapshots, sim.ticks + jump * TICK_RATE)
+                renderer.invalidate()
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                PROFILER.toggle()
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F4:
+                PROFILER.export()
+        PROFILER.mark("events")
+
+        # however many fixed ticks this frame's time adds up to, all with the keys as they are now
+        inputs = Inputs.from_keys(pygame.key.get_pressed())
+        for _ in range(timestep.advance(frame_time)):
+            if replay_inputs is not None:
+                inputs = next(replay_inputs, None)
+                if inputs is None:
                     break
-            if hit_customer:
-                # calculate points based on total thrown food count
-                total_thrown = len(thrown_foods)
-                if total_thrown == 1:
-                    points = 10
-                elif total_thrown == 2:
-                    points = 30
-                elif total_thrown == 3:
-                    points = 50
-                elif total_thrown == 4:
-                    points = 75
-                elif total_thrown >= 5:
-                    points = 100
-                else:
-                    points = total_thrown * 20
-                
-                score += points
-                thrown_foods.clear()
-                customers.remove(hit_customer)
-                break 
-
-            if not tf.alive:
-                thrown_foods.remove(tf)
-
-        for i, food in enumerate(player.food_stack):
-            img = pygame.image.load(food.path)
-            WIN.blit(pygame.transform.scale(img, (40, 40)), (player.x + PLAYER_WIDTH//2 - 20, player.y - (i + 1)*45))
-
-        # display player
-        WIN.blit(player.get_current_sprite(), (player.x, player.y))
-
-        pygame.display.update()
+            sim.step(timestep.dt, inputs)
+            for effect in sim.events:
+                AUDIO.play(effect)
+            if recorder is not None:
+                recorder.record(inputs)
+            if snapshots is not None:
+                snapshots.record(sim)
+            if sim.finished:
+                break
+        draw_game(renderer, sim, PROFILER, timestep.alpha)
+        if PROFILER.enabled:
+            draw_perf_overlay(renderer, sim)
+            PROFILER.mark("draw_overlay")
+        renderer.present()
+        PROFILER.mark("display_update")
+        PROFILER.end_frame()
+
+        if replay is not None and (sim.finished or inputs is None):
+            print(f"Replay finished with a score of {sim.score} (recorded: {replay.score})")
+            return
 
         # game over condition
-        if time_left <= 0:
+        if sim.finished:
             running = False
+            if recorder is not None:
+                recorder.save(sim.score)
             # show game over screen and get player name
-            show_game_over_screen(score)
+            show_game_over_screen(sim.score)
             return  # return to main menu
 
     pygame.quit()
 
+@functools.lru_cache(maxsize=None)
+def main_menu_layout(width, height):
+    title = Label("Deltarune If It Was Peak", MENU_FONT, (255, 255, 255), center=(width // 2, 100))
+    menu_rect = pygame.Rect(width//2 - 150, height//2 - 50, 300, 300)
+    # menu options
+    options = [
+        MenuOption("Play", FONT, (width // 2, height//2 - 20)),
+        MenuOption("Instructions", FONT, (width // 2, height//2 + 30)),
+        MenuOption("About", FONT, (width // 2, height//2 + 80)),
+        MenuOption("Leaderboard", FONT, (width // 2, height//2 + 130)),
+        MenuOption("Quit", FONT, (width // 2, height//2 + 180)),
+    ]
+    loading_label = Label("", FONT, (200, 200, 200), center=(width // 2, height - 60))
+    return title, menu_rect, translucent_panel(menu_rect.size), options, loading_label
+
 def main_menu():
-    try:
-        pygame.mixer.music.load("silly_menu.mp3")
-        pygame.mixer.music.play(-1) 
-    except pygame.error as e:
-        print(f"Could not load menu music: {e}")
+    AUDIO.play_music("menu")
     
-    cabbage_gif_left = GIFAnimation("new_sprites\\spr_tenna_dance_cabbage.gif", 300, 300)
-    cabbage_gif_right = GIFAnimation("new_sprites\\spr_tenna_dance_cabbage.gif", 300, 300)
+    use_menu_assets()
+    cabbage_gif_left = GIFAnimation("cabbage")
+    cabbage_gif_right = GIFAnimation("cabbage")
+    title, menu_rect, menu_surface, options, loading_label = main_menu_layout(WIDTH, HEIGHT)
+    scheduler = FrameScheduler(MENU_FPS)
+    first_frame = True
+    for option in options:
+        option.update(pygame.mouse.get_pos())
     
     while True:
-        WIN.blit(BACKGROUND_IMG, (0, 0))
-        
-        cabbage_gif_left.update()
-        cabbage_gif_right.update()
-        cabbage_frame_left = cabbage_gif_left.get_current_frame()
-        cabbage_frame_right = cabbage_gif_right.get_current_frame()
-        if cabbage_frame_left:
-            WIN.blit(cabbage_frame_left, (100, HEIGHT//2 - 150)) 
-        if cabbage_frame_right:
-            WIN.blit(cabbage_frame_right, (WIDTH - 400, HEIGHT//2 - 150))  
-        
-        draw_text_centered(WIN, "Deltarune If It Was Peak", MENU_FONT, (255, 255, 255), 100)
-
-        menu_rect = pygame.Rect(WIDTH//2 - 150, HEIGHT//2 - 50, 300, 300)
-        menu_surface = pygame.Surface((300, 300), pygame.SRCALPHA)
-        pygame.draw.rect(menu_surface, (0, 0, 0, 128), (0, 0, 300, 300)) 
-        WIN.blit(menu_surface, menu_rect)
-
-        mouse_pos = pygame.mouse.get_pos()
-        mouse_click = pygame.mouse.get_pressed()
-
-        # menu options
-        options = [
-            ("Play", HEIGHT//2 - 20),
-            ("Instructions", HEIGHT//2 + 30),
-            ("About", HEIGHT//2 + 80),
-            ("Leaderboard", HEIGHT//2 + 130),
-            ("Quit", HEIGHT//2 + 180)
-        ]
-
-        for option_text, y_pos in options:
-            text_surface = FONT.render(option_text, True, (255, 255, 255))
-            text_rect = text_surface.get_rect(center=(WIDTH//2, y_pos))
+        if scheduler.frame_due():
+            WIN.blit(BACKGROUND_IMG, (0, 0))
             
-            if text_rect.collidepoint(mouse_pos):
-                # highlight the text when hovering
-                pygame.draw.rect(WIN, (255, 255, 255, 50), text_rect.inflate(20, 10))
-                text_surface = FONT.render(option_text, True, (0, 0, 0))  # change text color to black
-                if mouse_click[0]:
-                    pygame.time.delay(200)
-                    if option_text == "Play":
-                        run_game()
-                    elif option_text == "Instructions":
-                        show_instructions()
-                    elif option_text == "About":
-                        show_about()
-                    elif option_text == "Leaderboard":
-                        show_leaderboard()
-                    elif option_text == "Quit":
-                        pygame.quit()
-                        exit()
+            cabbage_gif_left.update()
+            cabbage_gif_right.update()
+            cabbage_frame_left = cabbage_gif_left.get_current_frame()
+            cabbage_frame_right = cabbage_gif_right.get_current_frame()
+            if cabbage_frame_left:
+                WIN.blit(cabbage_frame_left, (100, HEIGHT//2 - 150)) 
+            if cabbage_frame_right:
+                WIN.blit(cabbage_frame_right, (WIDTH - 400, HEIGHT//2 - 150))  
             
-            WIN.blit(text_surface, text_rect)
+            title.draw(WIN)
+            WIN.blit(menu_surface, menu_rect)
 
-        pygame.display.update()
+            for option in options:
+                option.draw(WIN)
 
-        for event in pygame.event.get():
+            # small loading indicator while the rest of the sprites are still decoding
+            if not ASSETS.all_done():
+                loading_label.set(f"Loading... {int(ASSETS.progress() * 100)}%")
+                loading_label.draw(WIN)
+                scheduler.schedule(pygame.time.get_ticks() + 100)
+
+            pygame.display.update()
+            scheduler.drew()
+            scheduler.schedule(cabbage_gif_left.next_frame_time())
+            scheduler.schedule(cabbage_gif_right.next_frame_time())
+
+            if first_frame:
+                first_frame = False
+                print(f"First frame after {(time.perf_counter() - STARTUP_TIME) * 1000:.0f} ms")
+
+        for event in scheduler.wait():
             if event.type == pygame.QUIT:
                 pygame.quit()
                 exit()
-
+            elif event.type == pygame.MOUSEMOTION:
+                # only a change of hover highlight needs a new frame (a list, so every option gets updated)
+                if any([option.update(event.pos) for option in options]):
+                    scheduler.request_redraw()
+            elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                for option in options:
+                    if not option.rect.collidepoint(event.pos):
+                        continue
+                    if option.text == "Play":
+                        run_game()
+                    elif option.text == "Instructions":
+                        show_instructions()
+                    elif option.text == "About":
+                        show_about()
+                    elif option.text == "Leaderboard":
+                        show_leaderboard()
+                    elif option.text == "Quit":
+                        pygame.quit()
+                        exit()
+                    for menu_option in options:  # the mouse has probably moved while the other screen was open
+                        menu_option.update(pygame.mouse.get_pos())
+                    scheduler.request_redraw()  # the screen it opened drew over the menu
 
 if __name__ == "__main__":
-    main_menu()
\ No newline at end of file
+    bootstrap()
+    main_menu()
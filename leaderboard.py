@@ -0,0 +1,235 @@
+import csv
+import glob
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+
+# Leaderboard -----------------------------------------------------------
+# every score ever saved, in a SQLite file. the index on score means adding one and asking for the top few or
+# someone's rank only walks the part of the index it needs instead of reading, sorting and rewriting everything.
+# WAL mode lets several game processes (kiosks sharing the file) write at the same time without corrupting it,
+# a writer that finds the file busy waits up to BUSY_TIMEOUT for its turn
+
+LEADERBOARD_PATH = "leaderboard.db"
+LEGACY_CSV_PATH = "leaderboard.csv"  # the old top 5 file, imported once the first time the database is opened
+JOURNAL_PATH = "scores.{}.journal"  # scores that were saved but might not be in the database yet, one per process (pid)
+BUSY_TIMEOUT = 5  # seconds
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS scores (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        score INTEGER NOT NULL,
+        created REAL NOT NULL,
+        journal_id TEXT
+    )""",
+    # ties go to whoever got there first, same as the old stable sort
+    "CREATE INDEX IF NOT EXISTS scores_by_score ON scores (score DESC, id)",
+    # a journal entry that gets committed twice (crash right after the commit) only ends up in here once
+    "CREATE UNIQUE INDEX IF NOT EXISTS scores_by_journal_id ON scores (journal_id)",
+    "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)",
+]
+
+
+# reads the old leaderboard.csv (with or without its Name,Score header), skipping rows that don't parse
+def read_legacy_csv(path):
+    rows = []
+    try:
+        with open(path, newline='') as file:
+            for row in csv.reader(file):
+                if len(row) < 2 or row[0] == "Name":
+                    continue
+                try:
+                    rows.append((row[0], int(row[1])))
+                except ValueError:
+                    pass
+    except FileNotFoundError:
+        pass
+    return rows
+
+
+# entries in a score journal, a line cut off halfway by a crash is skipped
+def read_journal(path):
+    entries = []
+    try:
+        with open(path, encoding="utf-8") as file:
+            for line in file:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    pass
+    except FileNotFoundError:
+        pass
+    return entries
+
+
+class Leaderboard:
+    def __init__(self, path=LEADERBOARD_PATH, legacy_csv=LEGACY_CSV_PATH):
+        self.path = path
+        self.legacy_csv = legacy_csv
+        self.local = threading.local()  # sqlite connections can't be shared between threads, each one gets its own
+        self.ready = False
+        self.ready_lock = threading.Lock()
+
+    def connection(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=FULL")  # a commit is on disk once it returns, ScoreSaver relies on that
+            self.local.conn = conn
+        with self.ready_lock:
+            if not self.ready:
+                self._set_up(conn)
+                self.ready = True
+        return conn
+
+    # tables + the one time csv import, in one write transaction so two processes starting together don't both import
+    def _set_up(self, conn):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(scores)")]
+            if columns and "journal_id" not in columns:  # made before scores came through the journal
+                conn.execute("ALTER TABLE scores ADD COLUMN journal_id TEXT")
+            for statement in SCHEMA:
+                conn.execute(statement)
+            imported = conn.execute("SELECT value FROM meta WHERE key = 'legacy_csv_imported'").fetchone()
+            if imported is None and self.legacy_csv:
+                now = time.time()
+                conn.executemany("INSERT INTO scores (name, score, created) VALUES (?, ?, ?)",
+                                 [(name, score, now) for name, score in read_legacy_csv(self.legacy_csv)])
+                conn.execute("INSERT INTO meta (key, value) VALUES ('legacy_csv_imported', ?)", (self.legacy_csv,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    # returns the new row's id (None if that journal entry was already in)
+    def add(self, name, score, created=None, journal_id=None):
+        cursor = self.connection().execute(
+            "INSERT OR IGNORE INTO scores (name, score, created, journal_id) VALUES (?, ?, ?, ?)",
+            (name, int(score), created if created is not None else time.time(), journal_id))
+        return cursor.lastrowid if cursor.rowcount else None
+
+    # the best k as (name, score, journal id), best first
+    def entries(self, k=5):
+        return self.connection().execute(
+            "SELECT name, score, journal_id FROM scores ORDER BY score DESC, id LIMIT ?", (k,)).fetchall()
+
+    # the best k as (name, score), best first
+    def top(self, k=5):
+        return [(name, score) for name, score, _ in self.entries(k)]
+
+    # where a score would place (1 = best), ties placed behind the ones already there
+    def rank(self, score):
+        higher = self.connection().execute("SELECT COUNT(*) FROM scores WHERE score >= ?", (int(score),)).fetchone()
+        return higher[0] + 1
+
+    def count(self):
+        return self.connection().execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+
+    def close(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self.local.conn = None
+
+
+# saving a score from the game over screen is one append to a journal file, the database write happens on a
+# background thread. the journal is synced to disk before save() returns, so a score can't get lost once it's
+# there: whatever is still in it on the next start (crash, or the game closed mid-write) goes into the database
+# then. every process writes its own journal (scores.<pid>.journal), so copies of the game sharing a folder never
+# empty or replace each other's, and each journal is deleted once everything in it has been committed.
+# top() shows saved scores straight away, committed or not
+class ScoreSaver:
+    def __init__(self, leaderboard, journal_path=None, retry_delay=1.0):
+        self.leaderboard = leaderboard
+        self.journal_path = journal_path or JOURNAL_PATH.format(os.getpid())
+        self.retry_delay = retry_delay  # seconds to wait before trying again when the database is busy or broken
+        self.lock = threading.Lock()
+        self.pending = {}  # journal id -> entry, for everything not committed yet
+        self.sources = {}  # journal id -> the journal file that entry is in
+        self.queue = queue.Queue()
+        for path in self._claim_journals():
+            for entry in read_journal(path):
+                self.pending[entry["id"]] = entry
+                self.sources[entry["id"]] = path
+                self.queue.put(entry)
+            self._remove_if_done(path)
+        self.thread = threading.Thread(target=self._run, daemon=True, name="score-saver")
+        self.thread.start()
+
+    # takes over every journal in the folder, left behind by a crash or still being written by another copy of the
+    # game. each one is renamed to a name of our own before it's read, so its owner starts a new file for whatever
+    # it saves after that and nothing gets deleted along with it that wasn't read here first. the owner committing
+    # the same entries as well is fine, the database only takes each journal id once
+    def _claim_journals(self):
+        folder = os.path.dirname(self.journal_path)
+        claimed = []
+        for path in sorted(glob.glob(os.path.join(folder, JOURNAL_PATH.format("*")))):
+            mine = os.path.join(folder, JOURNAL_PATH.format(f"{os.getpid()}-{uuid.uuid4().hex[:8]}"))
+            try:
+                os.replace(path, mine)
+            except OSError:  # already taken by someone else, or open for writing right now (windows)
+                continue
+            claimed.append(mine)
+        return claimed
+
+    # a journal isn't needed any more once all of its entries are in the database (ours comes back on the next save)
+    def _remove_if_done(self, path):
+        if path in self.sources.values():
+            return
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Could not remove score journal: {e}")
+
+    def save(self, name, score):
+        entry = {"id": uuid.uuid4().hex, "name": name, "score": int(score), "created": time.time()}
+        line = json.dumps(entry) + "\n"
+        with self.lock:
+            with open(self.journal_path, "a", encoding="utf-8") as file:
+                file.write(line)
+                file.flush()
+                os.fsync(file.fileno())
+            self.pending[entry["id"]] = entry
+            self.sources[entry["id"]] = self.journal_path
+            self.queue.put(entry)
+        return entry["id"]
+
+    def _run(self):
+        while True:
+            entry = self.queue.get()
+            try:
+                self.leaderboard.add(entry["name"], entry["score"], entry["created"], journal_id=entry["id"])
+            except sqlite3.Error as e:
+                print(f"Error saving score (will retry): {e}")
+                time.sleep(self.retry_delay)
+                self.queue.put(entry)
+                self.queue.task_done()
+                continue
+            with self.lock:
+                self.pending.pop(entry["id"], None)
+                self._remove_if_done(self.sources.pop(entry["id"]))
+            self.queue.task_done()
+    # blocks until everything saved so far is in the database
+    def flush(self):
+        self.queue.join()
+
+    # best k as (name, score): the database's top k with the not yet committed scores mixed in
+    # (pending is read first, so a score committed in between shows up in the database rows and is skipped)
+    def top(self, k=5):
+        with self.lock:
+            pending = sorted(self.pending.values(), key=lambda entry: entry["created"])
+        rows = self.leaderboard.entries(k)
+        committed = {journal_id for _, _, journal_id in rows}
+        merged = [(name, score) for name, score, _ in rows]
+        merged += [(entry["name"], entry["score"]) for entry in pending if entry["id"] not in committed]
+        merged.sort(key=lambda row: row[1], reverse=True)  # stable, so ties keep the older score first
+        return merged[:k]
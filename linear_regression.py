@@ -1,17 +1,115 @@
-import pandas as pd
-from sklearn.linear_model import LinearRegression
+import csv
+import hashlib
+import json
+import math
+import os
+import threading
+import numpy as np
 
-# Load the dataset, then intialize and train the model
-def load_model():
-    original_df = pd.read_csv('Nutrition_Value_Dataset.csv')
-    filtered_df = original_df[['Energy (kCal)', 'Total Fat (g)']].dropna()
+DATASET_PATH = 'Nutrition_Value_Dataset.csv'
+MODEL_CACHE_PATH = 'model_cache.json' # fitted coefficients live here between runs
+CALORIES_COLUMN = 'Energy (kCal)'
+FAT_COLUMN = 'Total Fat (g)'
+MAX_CALORIES = 700
 
-    # Filter out high-calorie outliers
-    filtered_df = filtered_df[filtered_df['Energy (kCal)'] <= 700]
+# the two columns as (calories, fat) pairs, one row at a time. rows missing either value (empty, NA, nan...)
+# are skipped the way dropna did, and so are the high-calorie outliers
+def read_rows(path=DATASET_PATH):
+    with open(path, newline='') as file:
+        reader = csv.reader(file)
+        header = next(reader)
+        calories_index, fat_index = header.index(CALORIES_COLUMN), header.index(FAT_COLUMN)
+        for row in reader:
+            try:
+                calories, fat = float(row[calories_index]), float(row[fat_index])
+            except (IndexError, ValueError):
+                continue
+            if math.isnan(calories) or math.isnan(fat) or calories > MAX_CALORIES:
+                continue
+            yield calories, fat
 
-    X = filtered_df[['Energy (kCal)']] # calories
-    y = filtered_df['Total Fat (g)'] # fat
-    model = LinearRegression()
-    model.fit(X, y)
 
-    return model
+# least squares line through the dataset in one pass, without keeping the rows around.
+# the running means and co-moments are updated per row (Welford's method) instead of summing x, x² and xy
+# and subtracting at the end, so it's as exact as the old centered sklearn fit (same coefficients to ~1e-15)
+def load_model(path=DATASET_PATH):
+    n = 0
+    mean_x = mean_y = 0.0
+    sxx = sxy = 0.0
+    for x, y in read_rows(path):
+        n += 1
+        dx = x - mean_x
+        mean_x += dx / n
+        mean_y += (y - mean_y) / n
+        sxx += dx * (x - mean_x)
+        sxy += dx * (y - mean_y)
+    if n < 2 or sxx == 0:
+        raise ValueError(f"can't fit a line to {path}: {n} usable rows")
+    coef = sxy / sxx
+    return FatPredictor(coef, mean_y - coef * mean_x)
+
+
+# the fitted line is just two numbers, so this is all the game actually needs at runtime
+class FatPredictor:
+    def __init__(self, coef, intercept):
+        self.coef = coef
+        self.intercept = intercept
+
+    # same call shape as LinearRegression.predict: a list of [calories] rows in, a list of fats out
+    def predict(self, X):
+        return [self.coef * row[0] + self.intercept for row in X]
+
+    # vectorized version for a whole array of calories at once
+    def predict_calories(self, calories):
+        return self.coef * np.asarray(calories, dtype=float) + self.intercept
+
+
+# the cache key changes whenever the csv or the filter settings change, which forces a refit
+def dataset_key(path=DATASET_PATH):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(65536), b''):
+            digest.update(chunk)
+    params = json.dumps([CALORIES_COLUMN, FAT_COLUMN, MAX_CALORIES])
+    digest.update(params.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _read_cached_model(key):
+    try:
+        with open(MODEL_CACHE_PATH, 'r') as file:
+            cached = json.load(file)
+    except (FileNotFoundError, ValueError):
+        return None
+    if cached.get('key') != key:
+        return None
+    return FatPredictor(cached['coef'], cached['intercept'])
+
+
+def _write_cached_model(key, predictor):
+    try:
+        tmp_path = MODEL_CACHE_PATH + '.tmp'
+        with open(tmp_path, 'w') as file:
+            json.dump({'key': key, 'coef': predictor.coef, 'intercept': predictor.intercept}, file)
+        os.replace(tmp_path, MODEL_CACHE_PATH) # so a crash mid-write never leaves half a file
+    except OSError as e:
+        print(f"Could not save model cache: {e}")
+
+
+_predictor = None
+_predictor_lock = threading.Lock()
+
+# process-wide predictor: reads the cached coefficients if the dataset hasn't changed, otherwise fits once and saves them
+def get_model():
+    global _predictor
+    if _predictor is not None:
+        return _predictor
+    with _predictor_lock:
+        if _predictor is None:
+            key = dataset_key()
+            predictor = _read_cached_model(key)
+            if predictor is None:
+                predictor = load_model()
+                _write_cached_model(key, predictor)
+            _predictor = predictor
+    return _predictor
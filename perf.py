@@ -0,0 +1,119 @@
+import time
+import numpy as np
+import pygame
+
+# Performance overlay -----------------------------------------------------------
+# opt-in timing for the phases of the run_game loop. turned off it's a single attribute check per mark,
+# turned on (F3 in game, or GAME_PROFILE=1) every frame goes into a fixed size ring buffer
+
+GAME_PHASES = [
+    "events", "player", "food", "customers", "fireballs", "thrown_food",
+    "draw_background", "draw_hud", "draw_food", "draw_entities", "draw_player", "draw_overlay", "display_update",
+]
+
+
+class FrameProfiler:
+    def __init__(self, phases=GAME_PHASES, capacity=600, enabled=False):
+        self.phases = list(phases)
+        self.columns = self.phases + ["total", "interval"]
+        self.phase_index = {name: i for i, name in enumerate(self.phases)}
+        self.capacity = capacity
+        self.samples = np.zeros((capacity, len(self.columns)))  # ms, one row per frame
+        self.count = 0  # frames recorded so far (the newest row is (count - 1) % capacity)
+        self.enabled = enabled
+        self.current = [0.0] * len(self.columns)
+        self.frame_start = 0.0
+        self.last_mark = 0.0
+
+    def toggle(self):
+        self.enabled = not self.enabled
+
+    # interval is the full frame time from clock.tick, the phases only cover the work inside the frame
+    def begin_frame(self, interval=0):
+        if not self.enabled:
+            return
+        self.current = [0.0] * len(self.columns)
+        self.current[-1] = interval
+        self.frame_start = self.last_mark = time.perf_counter()
+
+    # adds the time since the previous mark to this phase
+    def mark(self, phase):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.current[self.phase_index[phase]] += (now - self.last_mark) * 1000
+        self.last_mark = now
+
+    def end_frame(self):
+        if not self.enabled:
+            return
+        self.current[-2] = (time.perf_counter() - self.frame_start) * 1000
+        self.samples[self.count % self.capacity] = self.current
+        self.count += 1
+
+    # recorded rows, oldest first
+    def history(self):
+        if self.count <= self.capacity:
+            return self.samples[:self.count]
+        start = self.count % self.capacity
+        return np.concatenate([self.samples[start:], self.samples[:start]])
+
+    def averages(self, frames=60):
+        recent = self.history()[-frames:]
+        if len(recent) == 0:
+            return {}
+        return dict(zip(self.columns, recent.mean(axis=0)))
+
+    def export(self, path=None):
+        if path is None:
+            path = time.strftime("perf_%Y%m%d_%H%M%S.csv")
+        np.savetxt(path, self.history(), delimiter=",", fmt="%.4f", header=",".join(self.columns), comments="")
+        print(f"Saved {min(self.count, self.capacity)} frames of timings to {path}")
+        return path
+
+
+# stands in when nothing is profiling, so the simulation and draw code can call mark() unconditionally
+class NullProfiler:
+    enabled = False
+
+    def begin_frame(self, interval=0):
+        pass
+
+    def mark(self, phase):
+        pass
+
+    def end_frame(self):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
+
+
+# frame time graph + per phase averages + whatever extra lines the caller wants (entity counts, cache stats)
+# returns the rect it covered
+def draw_overlay(win, profiler, font, extra_lines, x=10, y=10):
+    history = profiler.history()[-120:]
+    averages = profiler.averages()
+    lines = [f"frame {averages.get('interval', 0):5.1f} ms   work {averages.get('total', 0):5.2f} ms"]
+    lines += [f"{name:<15}{averages.get(name, 0):6.2f} ms" for name in profiler.phases]
+    lines += extra_lines
+
+    graph_width, graph_height = 240, 80
+    line_height = font.get_linesize()
+    panel = pygame.Surface((graph_width + 20, graph_height + 30 + line_height * len(lines)), pygame.SRCALPHA)
+    panel.fill((0, 0, 0, 170))
+
+    # bars are the full frame interval, the brighter part is the actual work, the line is the 60 FPS budget
+    scale = graph_height / 50.0  # 50 ms fills the graph
+    for i, row in enumerate(history):
+        bar_x = 10 + i * 2
+        interval = min(row[-1], 50) * scale
+        work = min(row[-2], 50) * scale
+        pygame.draw.line(panel, (90, 90, 160), (bar_x, 10 + graph_height), (bar_x, 10 + graph_height - interval))
+        pygame.draw.line(panel, (120, 230, 120), (bar_x, 10 + graph_height), (bar_x, 10 + graph_height - work))
+    budget_y = 10 + graph_height - 1000 / 60 * scale
+    pygame.draw.line(panel, (230, 80, 80), (10, budget_y), (10 + graph_width, budget_y))
+
+    for i, text in enumerate(lines):
+        panel.blit(font.render(text, True, (255, 255, 255)), (10, graph_height + 20 + i * line_height))
+    return win.blit(panel, (x, y))
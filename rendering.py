@@ -0,0 +1,130 @@
+import pygame
+
+# Rendering helpers -----------------------------------------------------------
+
+# merges rects that overlap (or nearly touch) so display.update gets a short list instead of hundreds
+# sorted sweep, so it's n log n instead of checking every pair
+def merge_rects(rects, slack=8):
+    merged = []
+    for rect in sorted(rects, key=lambda r: r.x):
+        if merged and merged[-1].inflate(slack, slack).colliderect(rect):
+            merged[-1] = merged[-1].union(rect)
+        else:
+            merged.append(rect)
+    return merged
+
+
+# only redraws the parts of the screen that changed. every blit goes through here so it knows where things
+# were drawn, next frame it puts the background back under those spots (and only those) before drawing again,
+# then tells display.update about the old + new spots. if that adds up to a big chunk of the screen it just
+# does a normal full redraw since that's cheaper than hundreds of little ones
+class DirtyRenderer:
+    def __init__(self, win, background, full_redraw_ratio=0.35):
+        self.win = win
+        self.background = background
+        self.screen_rect = win.get_rect()
+        self.full_redraw_area = self.screen_rect.width * self.screen_rect.height * full_redraw_ratio
+        self.previous_rects = []
+        self.current_rects = []
+        self.full_redraw = True  # the first frame always draws everything
+        self.last_update_was_full = True
+
+    # call when something else drew over the screen (another menu, the overlay going away...)
+    def invalidate(self):
+        self.full_redraw = True
+
+    def begin_frame(self):
+        self.current_rects = []
+        if self.full_redraw or self.area(self.previous_rects) > self.full_redraw_area:
+            self.win.blit(self.background, (0, 0))
+            self.full_redraw = True
+        else:
+            for rect in self.previous_rects:
+                self.win.blit(self.background, rect, rect)
+
+    # dirty=False is for opaque surfaces that haven't changed since last frame (like the HUD),
+    # drawing them again gives the exact same pixels so the screen doesn't need updating there
+    def blit(self, surface, position, area=None, dirty=True):
+        rect = self.win.blit(surface, position, area)
+        if dirty and rect.width and rect.height:
+            self.current_rects.append(rect)
+        return rect
+
+    # same as blit for a whole list of (surface, position) pairs, through one Surface.blits call
+    def blits(self, sequence):
+        rects = self.win.blits(sequence)
+        self.current_rects.extend(rect for rect in rects if rect.width and rect.height)
+        return rects
+
+    # for things drawn straight onto the window (pygame.draw, overlays) that should still get cleaned up
+    def add_dirty(self, rect):
+        if rect.width and rect.height:
+            self.current_rects.append(pygame.Rect(rect))
+
+    def area(self, rects):
+        return sum(rect.width * rect.height for rect in rects)
+
+    def present(self):
+        dirty = merge_rects(self.previous_rects + self.current_rects)
+        if self.full_redraw or self.area(dirty) > self.full_redraw_area:
+            pygame.display.update()
+            self.last_update_was_full = True
+        else:
+            pygame.display.update(dirty)
+            self.last_update_was_full = False
+        self.previous_rects = self.current_rects
+        self.full_redraw = False
+        return dirty
+
+
+# digits rendered once, numbers get put together from them instead of font.render every time
+class GlyphAtlas:
+    def __init__(self, font, color, characters="0123456789"):
+        self.glyphs = {character: font.render(character, True, color) for character in characters}
+        self.height = max(glyph.get_height() for glyph in self.glyphs.values())
+
+    def width(self, text):
+        return sum(self.glyphs[character].get_width() for character in text)
+
+    def blit(self, target, text, position):
+        x, y = position
+        for character in text:
+            glyph = self.glyphs[character]
+            target.blit(glyph, (x, y))
+            x += glyph.get_width()
+
+
+# the scoreboard with score and time. it's drawn into its own surface (background included, so it's fully
+# opaque) and that surface is only rebuilt when the score or the time left actually changes
+class Hud:
+    def __init__(self, background, scoreboard_sprite, font, position, size=(450, 220), color=(255, 255, 255)):
+        self.rect = pygame.Rect(position, size).clip(background.get_rect())
+        self.backdrop = background.subsurface(self.rect).copy()
+        self.backdrop.blit(pygame.transform.scale(scoreboard_sprite, size), (0, 0))  # scaled once, not every frame
+        self.score_label = font.render("SCORE:", True, color)
+        self.time_label = font.render("TIME: ", True, color)
+        self.digits = GlyphAtlas(font, color)
+        self.surface = self.backdrop.copy()
+        self.score = None
+        self.time_left = None
+        self.changed = True
+
+    # returns True if the HUD surface had to be redrawn
+    def update(self, score, time_left):
+        self.changed = score != self.score or time_left != self.time_left
+        if not self.changed:
+            return False
+        self.score = score
+        self.time_left = time_left
+        width = self.rect.width
+
+        self.surface.blit(self.backdrop, (0, 0))
+        self.surface.blit(self.time_label, (20, 20))
+        self.digits.blit(self.surface, str(time_left), (20 + self.time_label.get_width(), 20))
+        self.surface.blit(self.score_label, ((width - self.score_label.get_width()) // 2, 60))
+        score_text = str(score)
+        self.digits.blit(self.surface, score_text, ((width - self.digits.width(score_text)) // 2, 120))
+        return True
+
+    def draw(self, renderer):
+        renderer.blit(self.surface, self.rect.topleft, dirty=self.changed)
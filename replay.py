@@ -0,0 +1,245 @@
+"""Recorded rounds: every round's keys and seed, small enough to keep all of them.
+
+usage:
+    python replay.py replays/20260101_120000_230.replay            # re-simulate headless as fast as possible
+    python replay.py replays/20260101_120000_230.replay --watch    # play it back on screen in real time
+    python replay.py replays/20260101_120000_230.replay --seek 45  # jump to 45 s in and show the state there
+
+While watching, the left and right arrow keys jump back and forward 5 seconds (see snapshot.py).
+
+Headless playback exits with 1 when the re-simulated score doesn't match the one the recording says it got.
+"""
+import argparse
+import os
+import struct
+import sys
+import time
+from simulation import GameSimulation, Inputs, TICK_MS, TICK_RATE
+from snapshot import SnapshotBuffer, capture, restore
+
+# Replay format -----------------------------------------------------------
+# header, then one record per change of input: a varint holding (ticks the previous state lasted << 4 | new state).
+# a state is the 4 bits from Inputs.to_bits, and holding the same keys costs nothing however long it lasts,
+# so an hour of normal play comes out at a few tens of kilobytes
+# header: magic, version, tick rate, seed, width, height, flags, ticks, final score, length of the records
+
+REPLAY_MAGIC = b"SUMRPLAY"
+REPLAY_VERSION = 1
+REPLAY_HEADER = "<8sHHIHHBIiI"
+STATE_BITS = 4
+FLAG_PIXEL_COLLISION = 1
+
+REPLAY_DIR = "replays"
+
+
+def write_varint(buffer, value):
+    while value >= 0x80:
+        buffer.append(value & 0x7F | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def read_varint(data, position):
+    value = shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
+
+
+class Replay:
+    def __init__(self, seed, width, height, pixel_collision, ticks=0, score=0, records=b"", tick_rate=TICK_RATE):
+        self.seed = seed
+        self.width = width
+        self.height = height
+        self.pixel_collision = pixel_collision
+        self.ticks = ticks
+        self.score = score  # what the round ended on when it was recorded
+        self.records = bytes(records)
+        self.tick_rate = tick_rate
+
+    @property
+    def duration(self):
+        return self.ticks / self.tick_rate  # seconds
+
+    # (key state, how many ticks it was held) for the whole round
+    def runs(self):
+        data, position = self.records, 0
+        state, tick = 0, 0
+        while position < len(data):
+            value, position = read_varint(data, position)
+            run = value >> STATE_BITS
+            if run:
+                yield state, run
+            tick += run
+            state = value & ((1 << STATE_BITS) - 1)
+        yield state, self.ticks - tick
+
+    # the Inputs for every tick from start on, in order
+    def inputs(self, start=0):
+        tick = 0
+        for state, run in self.runs():
+            inputs = Inputs.from_bits(state)
+            for _ in range(min(run, tick + run - start)):
+                yield inputs
+            tick += run
+
+    def to_bytes(self):
+        flags = FLAG_PIXEL_COLLISION if self.pixel_collision else 0
+        header = struct.pack(REPLAY_HEADER, REPLAY_MAGIC, REPLAY_VERSION, self.tick_rate, self.seed, self.width,
+                             self.height, flags, self.ticks, self.score, len(self.records))
+        return header + self.records
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, version, tick_rate, seed, width, height, flags, ticks, score, length = \
+            struct.unpack_from(REPLAY_HEADER, data, 0)
+        if magic != REPLAY_MAGIC or version != REPLAY_VERSION:
+            raise ValueError(f"not a version {REPLAY_VERSION} replay")
+        start = struct.calcsize(REPLAY_HEADER)
+        records = data[start:start + length]
+        if len(records) != length:
+            raise ValueError("replay is cut short")
+        return cls(seed, width, height, bool(flags & FLAG_PIXEL_COLLISION), ticks, score, records, tick_rate)
+
+    def save(self, path):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as file:
+            file.write(self.to_bytes())
+        os.replace(tmp_path, path)  # so a crash mid-write never leaves half a file
+        return path
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as file:
+            return cls.from_bytes(file.read())
+
+
+# builds a Replay one tick at a time while a round is being played
+class Recorder:
+    def __init__(self, seed, width, height, pixel_collision):
+        self.replay = Replay(seed, width, height, pixel_collision)
+        self.records = bytearray()
+        self.state = 0
+        self.last_change = 0
+        self.ticks = 0
+
+    # call once per sim.step, with the inputs that step got
+    def record(self, inputs):
+        state = inputs.to_bits()
+        if state != self.state:
+            write_varint(self.records, (self.ticks - self.last_change) << STATE_BITS | state)
+            self.state = state
+            self.last_change = self.ticks
+        self.ticks += 1
+
+    def finish(self, score):
+        self.replay.ticks = self.ticks
+        self.replay.score = score
+        self.replay.records = bytes(self.records)
+        return self.replay
+
+    # saves into REPLAY_DIR as <date>_<time>_<score>.replay
+    def save(self, score, directory=REPLAY_DIR):
+        replay = self.finish(score)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            return replay.save(os.path.join(directory, time.strftime("%Y%m%d_%H%M%S") + f"_{score}.replay"))
+        except OSError as e:
+            print(f"Could not save replay: {e}")
+            return None
+
+
+# plays a replay back headless, as fast as it goes. masks has to be a collision.PixelMasks when the round
+# was recorded with pixel perfect collisions, otherwise the hits (and so the score) won't come out the same
+# with a SnapshotBuffer it also fills that in on the way, for seek()
+def simulate(replay, masks=None, snapshots=None):
+    if replay.tick_rate != TICK_RATE:
+        raise ValueError(f"replay was recorded at {replay.tick_rate} ticks per second, the game runs at {TICK_RATE}")
+    sim = GameSimulation(replay.width, replay.height, seed=replay.seed)
+    sim.masks = masks
+    if snapshots is not None:
+        snapshots.record(sim)
+    for inputs in replay.inputs():
+        sim.step(TICK_MS, inputs)
+        if snapshots is not None:
+            snapshots.record(sim)
+    return sim
+
+
+# moves a replayed round to any tick: puts back the nearest snapshot before it and steps the rest of the way
+# (taking snapshots as it goes, so jumping forward past them gets quicker the second time).
+# returns the inputs from that tick on, for carrying on from there
+def seek(sim, replay, snapshots, tick):
+    tick = max(0, min(tick, replay.ticks))
+    start = snapshots.restore(sim, tick)
+    if start is None:
+        raise ValueError(f"no snapshot at or before tick {tick} (the memory budget dropped it)")
+    inputs = replay.inputs(start)
+    for _ in range(tick - start):
+        sim.step(TICK_MS, next(inputs))
+        snapshots.record(sim)
+    return inputs
+
+
+# the masks come from the game's sprites, so that needs the game module (and a window, a hidden one does)
+def load_masks(replay):
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")  # nothing gets played, no need for a real sound device
+    os.environ["GAME_RESOLUTION"] = f"{replay.width}x{replay.height}"
+    import game
+    game.bootstrap()
+    game.use_menu_assets()
+    game.use_game_assets()
+    return game.PIXEL_MASKS
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play back a recorded round")
+    parser.add_argument("path")
+    parser.add_argument("--watch", action="store_true", help="draw it in real time instead of re-simulating headless")
+    parser.add_argument("--seek", type=float, help="after re-simulating, jump to this many seconds in")
+    parser.add_argument("--snapshot-mb", type=float, default=16, help="memory budget for the snapshots taken for --seek")
+    args = parser.parse_args()
+
+    replay = Replay.load(args.path)
+    print(f"{args.path}: seed {replay.seed}, {replay.width}x{replay.height}, {replay.ticks} ticks "
+          f"({replay.duration:.1f} s), {len(replay.records)} bytes of input, recorded score {replay.score}")
+
+    if args.watch:
+        os.environ["GAME_RESOLUTION"] = f"{replay.width}x{replay.height}"
+        import game
+        game.bootstrap()
+        game.use_menu_assets()
+        game.run_game(replay)
+        sys.exit(0)
+
+    masks = load_masks(replay) if replay.pixel_collision else None
+    snapshots = SnapshotBuffer(max_bytes=int(args.snapshot_mb * 1024 * 1024)) if args.seek is not None else None
+    start = time.perf_counter()
+    sim = simulate(replay, masks, snapshots)
+    elapsed = time.perf_counter() - start
+    print(f"re-simulated in {elapsed * 1000:.0f} ms ({replay.ticks / max(elapsed, 1e-9):.0f} ticks/s), score {sim.score}")
+    final_score = sim.score
+
+    if args.seek is not None:
+        print(f"{len(snapshots)} snapshots, {snapshots.size / 1024:.0f} KB")
+        start = time.perf_counter()
+        seek(sim, replay, snapshots, round(args.seek * TICK_RATE))
+        seek_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        data = capture(sim)
+        capture_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        restore(sim, data)
+        restore_ms = (time.perf_counter() - start) * 1000
+        print(f"at {sim.now / 1000:.2f} s: score {sim.score}, {sim.time_left} s left, player at "
+              f"({sim.player.x:.0f}, {sim.player.y:.0f}) {sim.player.state}, stack {len(sim.player.food_stack)}, "
+              f"{len(sim.customers)} customers, {len(sim.fireballs) + len(sim.obstacle_fireballs)} fireballs")
+        print(f"seek {seek_ms:.2f} ms, snapshot {capture_ms:.3f} ms ({len(data)} bytes), restore {restore_ms:.3f} ms")
+    if final_score != replay.score:
+        print(f"score mismatch: recorded {replay.score}, replayed {final_score}")
+        sys.exit(1)
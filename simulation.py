@@ -0,0 +1,552 @@
+import random
+import numpy as np
+import pygame
+from classes import FoodPool
+from collision import CollisionWorld
+from entities import EntityStore
+from perf import NULL_PROFILER
+
+# Game simulation -----------------------------------------------------------
+# everything that happens in a round, with no window, sound or real clock involved.
+# run_game feeds it fixed size ticks and the keys, then draws somewhere between the last two states it was in.
+# speeds are in pixels per second (and gravity in pixels per second squared), so they don't depend on the tick size
+
+PLAYER_WIDTH, PLAYER_HEIGHT = 70, 120
+MAX_FOOD_STACK = 5
+STUN_DURATION = 1
+FIREBALL_SPAWN_INTERVAL = 5000
+CUSTOMER_SPAWN_INTERVAL = 1600
+MISSED_FOOD_FIREBALL_DURATION = 1500
+ROUND_LENGTH = 90  # seconds
+TICK_RATE = 60  # simulation steps per second, whatever the frame rate is
+TICK_MS = 1000 / TICK_RATE
+MAX_FRAME_TIME = 250  # ms, a longer frame (window dragged, breakpoint hit...) only catches up this much
+
+CUSTOMER_WIDTH, CUSTOMER_HEIGHT = 100, 120
+CUSTOMER_SPEED = 180
+CUSTOMER_FRAME_TIME = 300  # ms per walking frame
+FIREBALL_SIZE = 40
+FIREBALL_LIFETIME = 2000  # ms a penalty fireball stays on the ground
+FIREBALL_BLINK_AFTER = 1200  # then it blinks every 100 ms until it goes away
+OBSTACLE_FIREBALL_SPEED = 180
+THROWN_FOOD_SIZE = 50
+THROWN_FOOD_SPEED = 600
+FOOD_FALL_SPEED = 240
+
+
+# the only keys the game reads, so a whole frame of input is just four booleans
+class Inputs:
+    def __init__(self, left=False, right=False, jump=False, throw=False):
+        self.left = left
+        self.right = right
+        self.jump = jump
+        self.throw = throw
+
+    @classmethod
+    def from_keys(cls, keys):
+        return cls(keys[pygame.K_LEFT], keys[pygame.K_RIGHT], keys[pygame.K_x], keys[pygame.K_z])
+
+    # one bit per key (left, right, jump, throw from the lowest bit up), what replays store
+    def to_bits(self):
+        return bool(self.left) | bool(self.right) << 1 | bool(self.jump) << 2 | bool(self.throw) << 3
+
+    @classmethod
+    def from_bits(cls, bits):
+        return cls(bool(bits & 1), bool(bits & 2), bool(bits & 4), bool(bits & 8))
+
+
+class Player:
+    def __init__(self, world):
+        self.world = world
+        self.x = world.width // 2
+        self.y = world.ground_y
+        self.prev_x = self.x  # where the player was one step ago, the drawing interpolates from there
+        self.prev_y = self.y
+        self.vel_y = 0
+        self.gravity = 2880
+        self.jump_strength = -900
+        self.on_ground = True
+        self.base_speed = 480
+        self.speed = self.base_speed
+        self.direction = "idle"
+        self.state = "normal"
+        self.throw_anim_time = 0
+        self.threw_this_cycle = False
+        self.stun_time = 0
+        self.food_stack = []
+
+    def update_speed(self):
+        penalty = min(len(self.food_stack) * 0.1, 0.5)
+        self.speed = self.base_speed * (1 - penalty)
+
+    # dt is in seconds
+    def move(self, inputs, dt):
+        if self.state in ["hit", "stunned", "throw_start", "throwing"]:
+            return
+        moving = False
+        if inputs.left and self.x > self.world.width//4:
+            self.x -= self.speed * dt
+            self.direction = "left"
+            moving = True
+        if inputs.right and self.x < (self.world.width//4)*3 - PLAYER_WIDTH:
+            self.x += self.speed * dt
+            self.direction = "right"
+            moving = True
+        if not moving:
+            self.direction = "idle"
+        if inputs.jump and self.on_ground:
+            self.vel_y = self.jump_strength
+            self.on_ground = False
+
+    def apply_gravity(self, dt):
+        self.vel_y += self.gravity * dt
+        self.y += self.vel_y * dt
+        if self.y >= self.world.ground_y:
+            self.y = self.world.ground_y
+            self.vel_y = 0
+            self.on_ground = True
+
+    def start_throw(self, now):
+        if self.state == "normal" and len(self.food_stack) > 0:
+            self.state = "throw_start"
+            self.throw_anim_time = now
+
+    def update_throw(self, now):
+        if self.state == "throw_start" and now - self.throw_anim_time > 150:
+            self.state = "throwing"
+        elif self.state == "throwing" and now - self.throw_anim_time > 300:
+            self.state = "normal"
+            self.threw_this_cycle = False
+
+    # which PLAYER_SPRITES entry matches the player's state
+    def get_sprite_name(self):
+        if self.state == "hit":
+            return "hit"
+        elif self.state == "stunned":
+            return "stunned"
+        elif self.state == "throw_start":
+            return "throw_start"
+        elif self.state == "throwing":
+            return "throw"
+        elif not self.on_ground:
+            return "jump"
+        else:
+            if self.direction == "left":
+                return "walk_left"
+            elif self.direction == "right":
+                return "walk_right"
+            else:
+                return "idle"
+
+    def stun(self, now):
+        self.state = "stunned"
+        self.stun_time = now
+        self.food_stack.clear()
+        self.update_speed()
+
+    def update_stun(self, now):
+        if self.state == "stunned":
+            if now - self.stun_time > STUN_DURATION * 1000:
+                self.state = "normal"
+
+    def get_state(self):
+        state = {name: getattr(self, name) for name in PLAYER_STATE}
+        state["food_stack"] = list(self.food_stack)
+        return state
+
+    def set_state(self, state):
+        for name in PLAYER_STATE:
+            setattr(self, name, state[name])
+        self.food_stack = list(state["food_stack"])
+
+
+# what Player.get_state saves, the rest of its attributes never change during a round
+PLAYER_STATE = ["x", "y", "prev_x", "prev_y", "vel_y", "on_ground", "speed", "direction", "state",
+                "throw_anim_time", "threw_this_cycle", "stun_time"]
+
+# the same for GameSimulation (entity stores, the rng and the food pool are saved separately)
+SIMULATION_STATE = ["now", "ticks", "score", "timer", "start_time", "time_left",
+                    "current_food", "food_x", "food_y", "prev_food_y", "food_speed", "food_spawn_time",
+                    "food_warning_visible", "food_warning_x",
+                    "obstacle_warning_visible", "obstacle_warning_side", "obstacle_warning_time",
+                    "last_customer_spawn", "last_fireball_spawn"]
+
+
+# points for hitting a customer, based on how many foods were thrown together
+def throw_points(total_thrown):
+    if total_thrown == 1:
+        return 10
+    elif total_thrown == 2:
+        return 30
+    elif total_thrown == 3:
+        return 50
+    elif total_thrown == 4:
+        return 75
+    elif total_thrown >= 5:
+        return 100
+    else:
+        return total_thrown * 20
+
+
+# accumulates real frame time and hands it out as whole ticks. a slow frame runs several ticks so the game
+# keeps its speed, a fast one may run none. alpha is how far the leftover time is into the next tick,
+# which is how far the drawing goes from the previous state towards the current one
+class FixedTimestep:
+    def __init__(self, dt=TICK_MS, max_frame_time=MAX_FRAME_TIME):
+        self.dt = dt
+        self.max_frame_time = max_frame_time
+        self.accumulator = 0.0
+        self.alpha = 1.0
+
+    # returns how many ticks to run for a frame that took frame_time ms
+    def advance(self, frame_time):
+        self.accumulator += min(frame_time, self.max_frame_time)
+        steps = int(self.accumulator // self.dt)
+        self.accumulator -= steps * self.dt
+        self.alpha = self.accumulator / self.dt
+        return steps
+
+
+# one round of the game. time only moves when step() is called, and all randomness comes from the seed,
+# so the same seed + the same inputs (and tick sizes) always play out exactly the same way
+class GameSimulation:
+    def __init__(self, width, height, seed=None, food_pool=None):
+        self.width = width
+        self.height = height
+        self.ground_y = (height//20)*11
+        self.seed = seed
+        self.rng = random.Random(seed)
+        # food comes from the shared background pool in the real game, a headless run makes its own (no thread)
+        self.food_pool = food_pool if food_pool is not None else FoodPool(seed=seed, background=False)
+        self.food_source = self.food_pool.get
+        self.profiler = NULL_PROFILER  # swap in a perf.FrameProfiler to time each part of step()
+
+        self.now = 0  # ms since the round started
+        self.events = []  # what happened during the last step ("catch", "hurt", "throw", "score"), for sound effects
+        self.ticks = 0  # steps taken so far
+        self.player = Player(self)
+        self.score = 0
+        self.timer = ROUND_LENGTH
+        self.start_time = 0
+        self.time_left = self.timer
+
+        self.current_food = None
+        self.food_x = 0
+        self.food_y = 0
+        self.prev_food_y = 0
+        self.food_speed = FOOD_FALL_SPEED
+        self.food_spawn_time = 0
+        self.food_warning_visible = False
+        self.food_warning_x = 0  # track warning x position (used to spawn food later)
+        self.obstacle_warning_visible = False
+        self.obstacle_warning_side = "left"
+        self.obstacle_warning_time = 0
+
+        # customers, fireballs and thrown food are rows in numpy arrays (see entities.py), not objects
+        self.customers = EntityStore("customer")
+        self.fireballs = EntityStore("fireball")  # the ones food turns into when it hits the ground
+        self.obstacle_fireballs = EntityStore("obstacle_fireball")  # the ones moving from side to side
+        self.thrown_foods = EntityStore("thrown_food")
+        self.collisions = CollisionWorld()  # broadphase layers, refreshed as each kind moves during step()
+        self.player_hitbox = pygame.Rect(0, 0, PLAYER_WIDTH, PLAYER_HEIGHT)
+        self.food_hitbox = pygame.Rect(0, 0, 50, 50)
+        self.masks = None  # a collision.PixelMasks turns on pixel perfect hits, None sticks to the hitbox rects
+
+        # far enough in the past that the first customer and fireball warning show up straight away
+        self.last_customer_spawn = -CUSTOMER_SPAWN_INTERVAL - 1
+        self.last_fireball_spawn = -FIREBALL_SPAWN_INTERVAL - 1
+
+    @property
+    def finished(self):
+        return self.time_left <= 0
+
+    # the same Rect every time, just moved to wherever the player is now
+    def player_rect(self):
+        self.player_hitbox.update(self.player.x, self.player.y, PLAYER_WIDTH, PLAYER_HEIGHT)
+        return self.player_hitbox
+
+    # spawning -----------------------------------------------------------
+
+    def spawn_customer(self, x=None):
+        return self.customers.spawn(self.width + 50 if x is None else x, self.ground_y + (self.height//20)*4,
+                                    vx=-CUSTOMER_SPEED, width=CUSTOMER_WIDTH, height=CUSTOMER_HEIGHT, spawn_time=self.now)
+
+    # penalty fireballs sit still, their hitbox is the top left 20x20 of the sprite
+    def spawn_fireball(self, x, y):
+        return self.fireballs.spawn(x, y, width=FIREBALL_SIZE, height=FIREBALL_SIZE, hitbox=(0, 0, 20, 20),
+                                    spawn_time=self.now)
+
+    def spawn_obstacle_fireball(self, x, y, direction):
+        speed = -OBSTACLE_FIREBALL_SPEED if direction == "left" else OBSTACLE_FIREBALL_SPEED
+        return self.obstacle_fireballs.spawn(x, y, vx=speed, width=FIREBALL_SIZE, height=FIREBALL_SIZE,
+                                             hitbox=(10, 10, 20, 20), spawn_time=self.now)
+
+    def spawn_thrown_food(self, food, x, y):
+        return self.thrown_foods.spawn(x, y, vy=THROWN_FOOD_SPEED, width=THROWN_FOOD_SIZE, height=THROWN_FOOD_SIZE,
+                                       spawn_time=self.now, payload=food)
+
+    # which customer sprite each customer is showing (they all animate off the round clock)
+    def customer_frames(self):
+        return self.customers.animation_frame(self.now, CUSTOMER_FRAME_TIME, 2)
+
+    # penalty fireballs that are drawn this frame (they blink before disappearing)
+    def fireballs_visible(self):
+        age = self.fireballs.age(self.now)
+        return (age <= FIREBALL_BLINK_AFTER) | ((age // 100) % 2 == 0)
+
+    # collisions -----------------------------------------------------------
+
+    # broadphase boxes for a kind: the tuned hitboxes, or the whole sprite when pixel masks make the final call
+    def update_layer(self, name, store):
+        return self.collisions.set_store(name, store, sprite=self.masks is not None)
+
+    # which of the fireball rows whose rects hit the player really touch it (pixel for pixel, with masks)
+    def touching_player(self, store, rows):
+        if self.masks is None or not len(rows):
+            return rows
+        player_mask = self.masks.player[self.player.get_sprite_name()]
+        player_position = (self.player.x, self.player.y)
+        x, y = store.x, store.y
+        return [i for i in rows.tolist()
+                if self.masks.overlap(player_mask, player_position, self.masks.fireball, (x[i], y[i]))]
+
+    def food_caught(self, food_rect):
+        if not len(self.collisions.collidelistall("player", food_rect)):
+            return False
+        if self.masks is None:
+            return True
+        return self.masks.overlap(self.masks.player[self.player.get_sprite_name()], (self.player.x, self.player.y),
+                                  self.masks.food(self.current_food.path), (self.food_x, self.food_y))
+
+    # the first (thrown food, customer) pair that hits, in throw order, or None
+    def thrown_food_hit(self):
+        if self.masks is None:
+            return self.collisions.first_pair("thrown_food", "customers")
+        thrown, customers = self.thrown_foods, self.customers
+        frames = self.customer_frames()
+        food_index, customer_index = self.collisions.pairs("thrown_food", "customers")
+        for f, c in zip(food_index.tolist(), customer_index.tolist()):
+            if self.masks.overlap(self.masks.food(thrown.payload[f].path), (thrown.x[f], thrown.y[f]),
+                                  self.masks.customers[frames[c]], (customers.x[c], customers.y[c])):
+                return f, c
+        return None
+
+    # hit by a fireball or bad food -> stun, lose stack, and lose points (only if not already stunned)
+    def hurt_player(self):
+        if self.player.state != "stunned":
+            self.score = max(0, self.score - 25)
+            self.events.append("hurt")
+        self.player.stun(self.now)
+
+    # everything that changes during a round, as plain python + numpy values (see snapshot.py)
+    def get_state(self):
+        state = {name: getattr(self, name) for name in SIMULATION_STATE}
+        state["rng"] = self.rng.getstate()
+        state["food_pool"] = self.food_pool.get_state()
+        state["player"] = self.player.get_state()
+        state["stores"] = {store.kind: store.get_state() for store in self.stores()}
+        return state
+
+    def set_state(self, state):
+        for name in SIMULATION_STATE:
+            setattr(self, name, state[name])
+        self.rng.setstate(state["rng"])
+        self.food_pool.set_state(state["food_pool"])
+        self.player.set_state(state["player"])
+        for store in self.stores():
+            store.set_state(state["stores"][store.kind])
+
+    def stores(self):
+        return self.customers, self.fireballs, self.obstacle_fireballs, self.thrown_foods
+
+    # interpolated positions for drawing, alpha=0 is the previous step and alpha=1 the current one
+    def player_position(self, alpha=1.0):
+        player = self.player
+        return (player.prev_x + (player.x - player.prev_x) * alpha,
+                player.prev_y + (player.y - player.prev_y) * alpha)
+
+    def food_position(self, alpha=1.0):
+        return self.food_x, self.prev_food_y + (self.food_y - self.prev_food_y) * alpha
+
+    # keeps this step's positions around before anything moves, so the drawing has two states to blend
+    def save_previous(self):
+        self.player.prev_x, self.player.prev_y = self.player.x, self.player.y
+        self.prev_food_y = self.food_y
+        for store in (self.customers, self.obstacle_fireballs, self.thrown_foods):
+            store.save_previous()
+
+    # advances the round by dt milliseconds (run_game always passes TICK_MS)
+    def step(self, dt, inputs):
+        self.save_previous()
+        self.events.clear()
+        self.ticks += 1
+        self.now += dt
+        now = self.now
+        seconds = dt / 1000
+        player = self.player
+
+        # update player stun timer
+        player.update_stun(now)
+
+        # player actions
+        player.move(inputs, seconds)
+        player.apply_gravity(seconds)
+        player.update_speed()
+        player.update_throw(now)
+
+        # update timer
+        elapsed_time = int((now - self.start_time) // 1000)
+        self.time_left = max(0, self.timer - elapsed_time)
+
+        # throw food if Z pressed
+        if inputs.throw:
+            player.start_throw(now)
+        self.collisions.set_rects("player", [self.player_rect()])
+        self.profiler.mark("player")
+
+        self.update_food(seconds)
+        self.profiler.mark("food")
+        self.update_customers(seconds)
+        self.profiler.mark("customers")
+        self.update_fireballs(seconds)
+        self.profiler.mark("fireballs")
+        self.update_thrown_food(seconds)
+
+        # everything that died during the step goes away together, the draw code only ever sees live entities
+        for store in self.stores():
+            store.compact()
+        self.profiler.mark("thrown_food")
+
+    # spawn food logic with warning sprite
+    def update_food(self, dt):
+        now = self.now
+        if self.current_food is None:
+            if not self.food_warning_visible:
+                # set warning position first, then show warning
+                self.food_warning_x = self.rng.randint(self.width//4, (self.width//4) * 3)
+                self.food_warning_visible = True
+                self.food_spawn_time = now + 1000  # warning visible for 1 sec
+            else:
+                if now >= self.food_spawn_time:
+                    self.current_food = self.food_source()
+                    self.food_x = self.food_warning_x  # use the same x position as warning
+                    self.food_y = self.prev_food_y = -50
+                    self.food_warning_visible = False
+            return
+
+        # move food down
+        self.food_y += self.food_speed * dt
+
+        # check catch
+        food_rect = self.food_hitbox
+        food_rect.topleft = (self.food_x, self.food_y)
+        if self.food_caught(food_rect) and self.player.state == "normal":
+            # add to stack if healthy
+            if self.current_food.is_healthy:
+                if len(self.player.food_stack) < MAX_FOOD_STACK:
+                    self.player.food_stack.append(self.current_food)
+                    self.player.update_speed()
+                    self.events.append("catch")
+                else:
+                    # stack full, food missed (turn into fireball)
+                    self.spawn_fireball(self.food_x, self.ground_y + 40)
+            else:
+                # bad food hit player -> lose stack + stun
+                self.hurt_player()
+            self.current_food = None
+
+        # check if food hits the ground
+        if self.food_y >= self.ground_y + (self.height//20)*2:
+            # food hit the ground -> turn into fireball
+            self.spawn_fireball(self.food_x, self.ground_y + (self.height//20)*2)
+            self.current_food = None
+
+    def update_customers(self, dt):
+        now = self.now
+        # spawn customers every CUSTOMER_SPAWN_INTERVAL
+        if now - self.last_customer_spawn > CUSTOMER_SPAWN_INTERVAL:
+            self.spawn_customer()
+            self.last_customer_spawn = now
+
+        # move every customer left in one go, the ones that walked off the screen go away
+        customers = self.customers
+        customers.move(dt)
+        customers.kill(customers.x < -CUSTOMER_WIDTH)
+        self.update_layer("customers", customers)
+
+    def update_fireballs(self, dt):
+        now = self.now
+        # spawn obstacle fireballs every FIREBALL_SPAWN_INTERVAL
+        if now - self.last_fireball_spawn > FIREBALL_SPAWN_INTERVAL:
+            if not self.obstacle_warning_visible:
+                self.obstacle_warning_side = self.rng.choice(["left", "right"])
+                self.obstacle_warning_visible = True
+                self.obstacle_warning_time = now + 1000  # 1 second warning
+            else:
+                if now >= self.obstacle_warning_time:
+                    # spawn the obstacle fireball
+                    y_pos = self.ground_y + (self.height//20)*2
+                    if self.obstacle_warning_side == "left":
+                        x_pos = -40  # spawn on the left edge
+                        direction = "right"
+                    else:
+                        x_pos = self.width  # spawn on the right edge
+                        direction = "left"
+                    self.spawn_obstacle_fireball(x_pos, y_pos, direction)
+                    self.obstacle_warning_visible = False
+                    self.last_fireball_spawn = now
+
+        # penalty fireballs burn out, obstacle fireballs fly off the screen, and either one goes away when it hits the player
+        # (hurt_player only takes points once per stun, so several hits in the same frame count as one)
+        player_rect = self.player_rect()
+        fireballs = self.fireballs
+        hits = self.touching_player(fireballs, self.update_layer("fireballs", fireballs).collidelistall(player_rect))
+        if len(hits):
+            self.hurt_player()
+        fireballs.kill(hits)
+        fireballs.kill(fireballs.age(now) > FIREBALL_LIFETIME)
+
+        obstacles = self.obstacle_fireballs
+        obstacles.move(dt)
+        hits = self.touching_player(obstacles, self.update_layer("obstacle_fireballs", obstacles).collidelistall(player_rect))
+        if len(hits):
+            self.hurt_player()
+        obstacles.kill(hits)
+        obstacles.kill((obstacles.x < -FIREBALL_SIZE) | (obstacles.x > self.width + FIREBALL_SIZE))
+
+    def update_thrown_food(self, dt):
+        player = self.player
+        if player.state == "throwing" and player.food_stack and not player.threw_this_cycle:
+            # throw all the food in the stack
+            stack_size = len(player.food_stack)
+            for i, food_to_throw in enumerate(player.food_stack[:]):
+                # spread the food items horizontally so they don't overlap (also makes hitting customers easier (it's not a bug, it's a feature))
+                x_offset = (i - stack_size//2) * 20
+                self.spawn_thrown_food(food_to_throw, player.x + PLAYER_WIDTH//2 - 25 + x_offset, player.y)
+
+            self.events.append("throw")
+
+            # clear the stack after throwing
+            player.food_stack.clear()
+            player.threw_this_cycle = True
+            player.update_speed()
+
+        thrown = self.thrown_foods
+        thrown.move(dt)
+        gone = thrown.y > self.height + THROWN_FOOD_SIZE
+
+        # the first thrown food (in throw order) that hits any customer scores, and takes the first customer it hit
+        self.update_layer("thrown_food", thrown)
+        hit = self.thrown_food_hit()
+        if hit is not None:
+            first, customer = hit
+            # points are based on how many thrown foods are still around, the ones before it that already
+            # fell off the screen don't count
+            still_thrown = thrown.count - int(np.count_nonzero(gone[:first]))
+            self.score += throw_points(still_thrown)
+            self.events.append("score")
+            thrown.kill(slice(None))
+            self.customers.kill(customer)
+            return
+
+        thrown.kill(gone)
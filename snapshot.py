@@ -0,0 +1,57 @@
+import pickle
+from collections import deque
+
+# Snapshots -----------------------------------------------------------
+# a round's whole state (GameSimulation.get_state) pickled into one bytes object. with the entity columns
+# cut down to the live rows a normal round comes out at a few kilobytes, and taking or restoring one is a
+# fraction of a millisecond, so a round can be snapshotted as it goes and put back at any of those points
+
+SNAPSHOT_INTERVAL = 60  # ticks between snapshots (one a second)
+SNAPSHOT_BUDGET = 16 * 1024 * 1024  # bytes, the oldest snapshots go once the buffer holds more than this
+
+
+def capture(sim):
+    return pickle.dumps(sim.get_state(), protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def restore(sim, data):
+    sim.set_state(pickle.loads(data))
+
+
+# snapshots of one round every interval ticks, oldest dropped first once they add up to more than max_bytes
+class SnapshotBuffer:
+    def __init__(self, interval=SNAPSHOT_INTERVAL, max_bytes=SNAPSHOT_BUDGET):
+        self.interval = interval
+        self.max_bytes = max_bytes
+        self.snapshots = {}  # tick -> snapshot
+        self.order = deque()  # ticks, in the order they were taken
+        self.size = 0
+
+    def __len__(self):
+        return len(self.snapshots)
+
+    # call after every step, it only takes one when the tick lands on the interval (and it doesn't have it yet,
+    # a round that was rewound plays out the same way again)
+    def record(self, sim):
+        tick = sim.ticks
+        if tick % self.interval or tick in self.snapshots:
+            return False
+        data = capture(sim)
+        self.snapshots[tick] = data
+        self.order.append(tick)
+        self.size += len(data)
+        while self.size > self.max_bytes and len(self.order) > 1:
+            self.size -= len(self.snapshots.pop(self.order.popleft()))
+        return True
+
+    # the latest tick at or before the given one that has a snapshot, None if they're all later
+    def nearest(self, tick):
+        earlier = [t for t in self.snapshots if t <= tick]
+        return max(earlier) if earlier else None
+
+    # puts sim back to the nearest snapshot at or before tick and returns that snapshot's tick (None if there isn't one)
+    def restore(self, sim, tick):
+        nearest = self.nearest(tick)
+        if nearest is not None:
+            restore(sim, self.snapshots[nearest])
+        return nearest
@@ -0,0 +1,109 @@
+import random
+
+import numpy as np
+import pygame
+import pytest
+
+from collision import SMALL_LAYER, Layer, colliding_pairs, first_colliding_pair
+
+# the broadphase has to find exactly what the nested colliderect loops it replaced found, in the same order.
+# set sizes go either side of SMALL_LAYER so the one by one path, the sweep, and a mix of the two all get checked
+
+
+def brute_force_pairs(rects_a, rects_b, valid_a=None, valid_b=None):
+    return [(i, j) for i, a in enumerate(rects_a) for j, b in enumerate(rects_b)
+            if (valid_a is None or valid_a[i]) and (valid_b is None or valid_b[j]) and a.colliderect(b)]
+
+
+# small coordinates and sizes so boxes pile up: touching edges, shared left edges and zero sized boxes all come up
+def random_rects(rng, count, span=60, max_size=15):
+    return [pygame.Rect(rng.randint(0, span), rng.randint(0, span), rng.randint(0, max_size), rng.randint(0, max_size))
+            for _ in range(count)]
+
+
+def layer(rects, valid=None):
+    return Layer([r.left for r in rects], [r.top for r in rects], [r.right for r in rects], [r.bottom for r in rects],
+                 None if valid is None else np.array(valid))
+
+
+def pairs(a, b):
+    a_index, b_index = colliding_pairs(a, b)
+    return list(zip(a_index.tolist(), b_index.tolist()))
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_random_sets_match_nested_loops(seed):
+    rng = random.Random(seed)
+    rects_a = random_rects(rng, rng.randint(0, 2 * SMALL_LAYER))
+    rects_b = random_rects(rng, rng.randint(0, 2 * SMALL_LAYER))
+    expected = brute_force_pairs(rects_a, rects_b)
+
+    assert pairs(layer(rects_a), layer(rects_b)) == expected
+    first = first_colliding_pair(layer(rects_a), layer(rects_b))
+    assert (first is None and not expected) or tuple(first) == expected[0]
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_random_sets_with_dead_entries(seed):
+    rng = random.Random(100 + seed)
+    rects_a = random_rects(rng, rng.randint(0, 2 * SMALL_LAYER))
+    rects_b = random_rects(rng, rng.randint(0, 2 * SMALL_LAYER))
+    valid_a = [rng.random() < 0.7 for _ in rects_a]
+    valid_b = [rng.random() < 0.7 for _ in rects_b]
+
+    assert pairs(layer(rects_a, valid_a), layer(rects_b, valid_b)) == \
+        brute_force_pairs(rects_a, rects_b, valid_a, valid_b)
+    assert pairs(Layer.from_boxes([(r.left, r.top, r.right, r.bottom) for r in rects_a], valid_a),
+                 layer(rects_b, valid_b)) == brute_force_pairs(rects_a, rects_b, valid_a, valid_b)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_collidelistall_matches_rect(seed):
+    rng = random.Random(200 + seed)
+    rects = random_rects(rng, rng.randint(0, 2 * SMALL_LAYER))
+    boxes = layer(rects)
+    for query in random_rects(rng, 20):
+        assert boxes.collidelistall(query).tolist() == query.collidelistall(rects)
+
+
+def test_touching_edges_dont_collide():
+    centre = pygame.Rect(10, 10, 10, 10)
+    around = [pygame.Rect(20, 10, 5, 10), pygame.Rect(5, 10, 5, 10), pygame.Rect(10, 20, 10, 5),
+              pygame.Rect(10, 5, 10, 5), pygame.Rect(20, 20, 5, 5)]
+    assert pairs(layer([centre]), layer(around)) == brute_force_pairs([centre], around) == []
+    # one pixel further in and they all do
+    inside = [r.move(-1 if r.left >= 20 else 1 if r.right <= 10 else 0,
+                     -1 if r.top >= 20 else 1 if r.bottom <= 10 else 0) for r in around]
+    assert pairs(layer([centre]), layer(inside)) == brute_force_pairs([centre], inside) == [(0, i) for i in range(5)]
+
+
+def test_zero_sized_rects_never_collide():
+    rects = [pygame.Rect(10, 10, 0, 10), pygame.Rect(10, 10, 10, 0), pygame.Rect(15, 15, 0, 0)]
+    big = [pygame.Rect(0, 0, 50, 50)]
+    assert pairs(layer(rects), layer(big)) == brute_force_pairs(rects, big) == []
+    assert first_colliding_pair(layer(rects), layer(big)) is None
+    assert layer(big).collidelistall(pygame.Rect(5, 5, 0, 0)).tolist() == []
+
+
+def test_duplicate_lefts_keep_nested_loop_order():
+    rects_a = [pygame.Rect(10, y, 10, 10) for y in (0, 30, 5, 0)]
+    rects_b = [pygame.Rect(10, y, 5, 5) for y in (40, 3, 8, 3, 0)]
+    expected = brute_force_pairs(rects_a, rects_b)
+    assert len(expected) > 4
+    assert pairs(layer(rects_a), layer(rects_b)) == expected
+    assert tuple(first_colliding_pair(layer(rects_a), layer(rects_b))) == expected[0]
+
+
+def test_empty_layers():
+    rects = [pygame.Rect(0, 0, 10, 10)]
+    assert pairs(layer([]), layer(rects)) == []
+    assert pairs(layer(rects), layer([])) == []
+    assert first_colliding_pair(layer([]), layer(rects)) is None
+
+
+def test_from_rects_matches_columns():
+    rng = random.Random(300)
+    for count in (3, SMALL_LAYER + 5):
+        rects_a = random_rects(rng, count)
+        rects_b = random_rects(rng, 20)
+        assert pairs(Layer.from_rects(rects_a), layer(rects_b)) == brute_force_pairs(rects_a, rects_b)
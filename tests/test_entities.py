@@ -0,0 +1,123 @@
+from entities import EntityStore, SLOT_BITS
+
+SLOT_MASK = (1 << SLOT_BITS) - 1
+
+
+def spawn_numbered(store, count):
+    for i in range(count):
+        store.spawn(x=i, y=0, width=10, height=10, payload=f"food {i}")
+
+
+# payloads have to stay on the same rows as their columns whichever rows die, not just the last ones
+def test_compact_keeps_payloads_with_their_rows():
+    store = EntityStore("thrown_food", capacity=4)
+    spawn_numbered(store, 10)
+    store.kill([0, 3, 4, 8])
+    store.compact()
+
+    assert len(store) == 6
+    assert store.x.tolist() == [1, 2, 5, 6, 7, 9]
+    assert store.payload == ["food 1", "food 2", "food 5", "food 6", "food 7", "food 9"]
+    assert store.column("alive").all()
+
+
+def test_compact_twice_in_a_row():
+    store = EntityStore("customer")
+    spawn_numbered(store, 6)
+    store.kill(1)
+    store.compact()
+    store.kill([0, 2])  # rows, which after the first compact hold x 0 and 3
+    store.compact()
+
+    assert store.x.tolist() == [2, 4, 5]
+    assert store.payload == ["food 2", "food 4", "food 5"]
+
+
+def test_compact_with_nothing_killed_changes_nothing():
+    store = EntityStore("fireball")
+    spawn_numbered(store, 3)
+    store.compact()
+
+    assert store.x.tolist() == [0, 1, 2]
+    assert store.payload == ["food 0", "food 1", "food 2"]
+
+
+# the list version is what small collision layers get built from, it has to truncate the same way (towards zero)
+def test_hitbox_list_matches_hitboxes():
+    store = EntityStore("fireball")
+    for x in (-12.7, -0.5, 0, 3.2, 99.9):
+        store.spawn(x=x, y=x / 2, width=40, height=30, hitbox=(5, -2.5, 30.6, 20))
+    left, top, right, bottom = store.hitboxes()
+    assert store.hitbox_list() == list(zip(left.tolist(), top.tolist(), right.tolist(), bottom.tolist()))
+    left, top, right, bottom = store.sprite_boxes()
+    assert store.hitbox_list(sprite=True) == list(zip(left.tolist(), top.tolist(), right.tolist(), bottom.tolist()))
+    assert EntityStore("fireball").hitbox_list() == []
+
+
+# handles -----------------------------------------------------------
+
+def test_handle_follows_its_entity_when_rows_move():
+    store = EntityStore("customer")
+    handles = [store.spawn(x=i, y=0, payload=i) for i in range(5)]
+    store.kill([0, 2])
+    store.compact()
+
+    for i in (1, 3, 4):
+        row = store.row(handles[i])
+        assert store.x[row] == i and store.payload[row] == i
+        assert store.handle(row) == handles[i]
+
+
+def test_removed_handle_is_gone_before_and_after_compact():
+    store = EntityStore("fireball")
+    handle = store.spawn(x=1, y=0)
+    other = store.spawn(x=2, y=0)
+    store.remove(handle)
+
+    assert store.row(handle) is None  # already gone, even though its row is only dropped at the end of the frame
+    assert len(store) == 2
+    store.compact()
+    assert store.row(handle) is None
+    assert store.x[store.row(other)] == 2
+    store.remove(handle)  # removing it again does nothing
+    assert len(store) == 1
+
+
+def test_reused_slot_gets_a_new_generation():
+    store = EntityStore("thrown_food", capacity=2)
+    old = store.spawn(x=1, y=0)
+    store.remove(old)
+    store.compact()
+    new = store.spawn(x=2, y=0)
+
+    assert new & SLOT_MASK == old & SLOT_MASK  # same slot...
+    assert new != old  # ...but a stale handle can't reach whatever got spawned into it
+    assert store.row(old) is None
+    assert store.x[store.row(new)] == 2
+    store.remove(old)  # and can't remove it either
+    assert store.row(new) is not None
+
+
+def test_handles_survive_growing():
+    store = EntityStore("customer", capacity=2)
+    handles = [store.spawn(x=i, y=0) for i in range(9)]
+    assert store.capacity >= 9
+    assert [store.x[store.row(h)] for h in handles] == list(range(9))
+    assert len(set(h & SLOT_MASK for h in handles)) == 9
+
+
+def test_state_round_trip_keeps_handles():
+    store = EntityStore("customer")
+    handles = [store.spawn(x=i, y=0, payload=f"c{i}") for i in range(4)]
+    store.remove(handles[1])
+    store.compact()
+    state = store.get_state()
+
+    copy = EntityStore("customer")
+    copy.set_state(state)
+    assert copy.row(handles[1]) is None
+    for i in (0, 2, 3):
+        assert copy.payload[copy.row(handles[i])] == f"c{i}"
+    # the freed slot comes back with a new generation in the copy too
+    reused = copy.spawn(x=9, y=0)
+    assert reused != handles[1] and copy.row(handles[1]) is None
@@ -0,0 +1,65 @@
+import glob
+import os
+import sqlite3
+import threading
+
+from leaderboard import JOURNAL_PATH, Leaderboard, ScoreSaver, read_journal
+
+# several copies of the game can share a folder: one of them committing its scores must never drop another's
+# pending ones, and whatever is left in any journal gets committed by the next copy that starts
+
+
+# writes fail until it's unstuck, like a database some other process keeps busy
+class StuckLeaderboard(Leaderboard):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.unstuck = threading.Event()
+
+    def add(self, *args, **kwargs):
+        if not self.unstuck.is_set():
+            raise sqlite3.OperationalError("database is locked")
+        return super().add(*args, **kwargs)
+
+
+def journal(folder, pid):
+    return os.path.join(folder, JOURNAL_PATH.format(pid))
+
+
+def journals(folder):
+    return glob.glob(os.path.join(folder, JOURNAL_PATH.format("*")))
+
+
+def test_committing_one_process_keeps_the_others_journal(tmp_path):
+    db = str(tmp_path / "leaderboard.db")
+    first = ScoreSaver(Leaderboard(db, legacy_csv=None), journal(tmp_path, 1))
+    stuck = StuckLeaderboard(db, legacy_csv=None)
+    second = ScoreSaver(stuck, journal(tmp_path, 2), retry_delay=0.01)
+
+    second.save("bea", 50)
+    first.save("al", 10)
+    first.flush()
+
+    assert journals(tmp_path) == [journal(tmp_path, 2)]
+    assert [entry["name"] for entry in read_journal(journal(tmp_path, 2))] == ["bea"]
+
+    # the second copy never gets its write through (closed, crashed), the next one to start commits it
+    third = ScoreSaver(Leaderboard(db, legacy_csv=None), journal(tmp_path, 3))
+    third.flush()
+    assert third.top() == [("bea", 50), ("al", 10)]
+    assert journals(tmp_path) == []
+
+    # and the second one finishing after all doesn't add it twice
+    stuck.unstuck.set()
+    second.flush()
+    assert Leaderboard(db, legacy_csv=None).count() == 2
+
+
+def test_half_written_line_is_skipped(tmp_path):
+    db = str(tmp_path / "leaderboard.db")
+    with open(journal(tmp_path, 7), "w", encoding="utf-8") as file:
+        file.write('{"id": "a1", "name": "al", "score": 10, "created": 1.0}\n{"id": "b2", "na')
+
+    saver = ScoreSaver(Leaderboard(db, legacy_csv=None), journal(tmp_path, 8))
+    saver.flush()
+    assert saver.top() == [("al", 10)]
+    assert journals(tmp_path) == []
@@ -0,0 +1,144 @@
+import math
+import pygame
+
+# Retained UI -----------------------------------------------------------
+# the menus used to render every bit of text again on every frame. these keep the rendered surfaces around
+# and only render again when the text, colour or hover state actually changes
+
+
+# SysFont has to look the font up every time, so every screen shares the same font objects
+class FontRegistry:
+    def __init__(self):
+        self.fonts = {}
+
+    def get(self, name="arial", size=24, bold=False):
+        key = (name, size, bold)
+        if key not in self.fonts:
+            self.fonts[key] = pygame.font.SysFont(name, size, bold=bold)
+        return self.fonts[key]
+
+
+FONTS = FontRegistry()
+
+
+# a bit of text that's rendered once, positioned with any pygame.Rect anchor (center=, midtop=, topleft=...)
+class Label:
+    def __init__(self, text, font, color, **anchor):
+        self.font = font
+        self.anchor = anchor
+        self.text = None
+        self.color = None
+        self.surface = None
+        self.rect = None
+        self.set(text, color)
+
+    # returns True if it had to render again
+    def set(self, text=None, color=None):
+        text = self.text if text is None else text
+        color = self.color if color is None else color
+        if text == self.text and color == self.color:
+            return False
+        self.text = text
+        self.color = color
+        self.surface = self.font.render(text, True, color)
+        self.rect = self.surface.get_rect(**self.anchor)
+        return True
+
+    def draw(self, win):
+        return win.blit(self.surface, self.rect)
+
+
+# clickable menu entry: white text normally, black text on a highlight box when the mouse is over it
+# (both versions are rendered up front, hovering just swaps which one gets drawn)
+class MenuOption:
+    def __init__(self, text, font, center, color=(255, 255, 255), hover_color=(0, 0, 0), highlight=(255, 255, 255, 50)):
+        self.text = text
+        self.normal_surface = font.render(text, True, color)
+        self.hover_surface = font.render(text, True, hover_color)
+        self.rect = self.normal_surface.get_rect(center=center)
+        self.highlight_rect = self.rect.inflate(20, 10)
+        self.highlight = highlight
+        self.hovered = False
+
+    # returns True if the hover state changed
+    def update(self, mouse_pos):
+        hovered = self.rect.collidepoint(mouse_pos)
+        changed = hovered != self.hovered
+        self.hovered = hovered
+        return changed
+
+    def draw(self, win):
+        if self.hovered:
+            pygame.draw.rect(win, self.highlight, self.highlight_rect)
+            return win.blit(self.hover_surface, self.rect)
+        return win.blit(self.normal_surface, self.rect)
+
+
+# a translucent box, built once instead of a new SRCALPHA surface every frame
+def translucent_panel(size, color=(0, 0, 0, 128)):
+    panel = pygame.Surface(size, pygame.SRCALPHA)
+    panel.fill(color)
+    return panel
+
+
+# Frame pacing -----------------------------------------------------------
+# the menus used to redraw as fast as the loop could spin, which kept a whole core busy showing the same picture.
+# a screen asks for a frame when something changed (input that changes what's shown, a gif frame coming up,
+# the loading %), in between it sleeps in pygame.event.wait until there's input or the next frame is due.
+# max_fps=None turns the cap off
+
+# the window needs painting again after these whatever the screen is doing
+EXPOSE_EVENTS = {pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED, pygame.WINDOWRESTORED, pygame.WINDOWSIZECHANGED}
+
+
+class FrameScheduler:
+    def __init__(self, max_fps=60, idle_timeout=1000):
+        self.min_interval = 1000 / max_fps if max_fps else 0
+        self.idle_timeout = idle_timeout  # longest it sleeps with nothing scheduled, just so it never hangs
+        self.last_frame = -self.min_interval
+        self.redraw = True  # the first frame always gets drawn
+        self.deadline = None
+
+    def request_redraw(self):
+        self.redraw = True
+
+    # asks for a frame at a given pygame.time.get_ticks() time (None is ignored), the earliest one wins
+    def schedule(self, at):
+        if at is not None and (self.deadline is None or at < self.deadline):
+            self.deadline = at
+
+    def frame_due(self):
+        now = pygame.time.get_ticks()
+        if self.deadline is not None and now >= self.deadline:
+            self.redraw = True
+        if self.redraw and now - self.last_frame >= self.min_interval:
+            self.last_frame = now  # the cap counts from when a frame starts, so drawing time doesn't lower the rate
+            return True
+        return False
+
+    # call once the frame is on screen, anything scheduled after this is for the next one
+    def drew(self):
+        self.redraw = False
+        self.deadline = None
+
+    # sleeps until there's input or the next frame is due and returns the events (same as pygame.event.get)
+    # input alone doesn't redraw anything, the screen calls request_redraw when an event changed what it shows
+    def wait(self):
+        now = pygame.time.get_ticks()
+        if self.redraw:
+            wake = self.last_frame + self.min_interval
+        elif self.deadline is not None:
+            wake = max(self.deadline, self.last_frame + self.min_interval)
+        else:
+            wake = now + self.idle_timeout
+        timeout = math.ceil(wake - now)
+
+        events = []
+        if timeout > 0:
+            first = pygame.event.wait(timeout)
+            if first.type != pygame.NOEVENT:
+                events.append(first)
+        events += pygame.event.get()
+        if any(event.type in EXPOSE_EVENTS for event in events):
+            self.redraw = True
+        return events